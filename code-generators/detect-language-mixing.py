@@ -59,6 +59,9 @@ import sys
 from html.parser import HTMLParser
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from doc_index import list_doc_files  # noqa: E402
+
 # `pre` classes that pin a block to one language. Anything else (html, json,
 # all, none) is language-neutral and intentionally shown to every reader.
 LANG_CLASSES = ("csharp", "python")
@@ -267,7 +270,7 @@ def main(argv):
     root = root.resolve()
     excludes = [e.replace("\\", "/").rstrip("/") for e in opts.exclude]
 
-    files = sorted(p for ext in ("*.html", "*.php") for p in root.rglob(ext))
+    files = list_doc_files(root, ".html", ".php")
 
     error_count = warning_count = 0
     skipped_single_page = skipped_excluded = 0
@@ -1,9 +1,12 @@
 import os
 import re
-from glob import iglob
-from itertools import chain
+import sys
+from pathlib import Path
 from shutil import rmtree
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from doc_index import load_doc_index  # noqa: E402
+
 output_dir = '03 Writing Algorithms/01 Key Concepts/99 Glossary'
 if os.path.exists(output_dir):
     rmtree(output_dir)
@@ -50,12 +53,11 @@ def fix_anchor(m):
 root_dirs = ["01 Cloud Platform/", "02 Local Platform/", "03 Writing Algorithms/",
              "04 Research Environment/", "05 Lean CLI/", "06 LEAN Engine/", "Resources/"]
 
-for filename in chain.from_iterable(
-    iglob(root_dir + f"**/*.{ext}", recursive=True)
-    for root_dir in root_dirs
-    for ext in ("html", "php", "json")
-):
-    filename = os.path.normpath(filename)
+doc_index = load_doc_index(Path("."))
+for doc in doc_index.files_with_suffix(".html", ".php", ".json"):
+    if not doc.path.startswith(tuple("./" + root_dir for root_dir in root_dirs)):
+        continue
+    filename = os.path.normpath(doc.path)
     content = open(filename, 'r', encoding="utf-8", errors='replace').read()
     if "glossary#" not in content:
         continue
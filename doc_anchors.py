@@ -25,6 +25,8 @@ import os
 import re
 from pathlib import Path
 
+from doc_index import file_route, load_doc_index
+
 # Section-anchor special-case replacements (applied to both expected path and
 # section name) for headings whose slug isn't a plain hyphenation of the words.
 SECTION_REPLACEMENTS = [
@@ -79,7 +81,7 @@ def check_deprecated_path(url: str) -> str | None:
     return None
 
 
-def _should_include(filepath: str) -> bool:
+def is_content_file(filepath: str) -> bool:
     """Keep only real documentation content files in the index."""
     return not any(part in filepath for part in (
         ".git", ".vs", "single-page", "08 Drafts",
@@ -87,16 +89,33 @@ def _should_include(filepath: str) -> bool:
     )) and not filepath.endswith("Documentation Updates.html")
 
 
-def build_file_index(base_path: Path) -> dict[str, list[str]]:
+class FileIndex(dict):
+    """Doc files by lowercased stem, plus a precomputed route index.
+
+    `routes` maps each file's file_route() to the files with that route, so an
+    anchor resolves with one hash lookup per expected path instead of recomputing
+    the route of every file that shares the section's stem.
+    """
+
+    def __init__(self, base_path: Path):
+        super().__init__()
+        self.base_path = base_path
+        self.routes: dict[str, list[str]] = {}
+
+    def add(self, filepath: str, route: str | None = None):
+        self.setdefault(Path(filepath).stem.lower(), []).append(filepath)
+        if route is None:
+            route = file_route(filepath, self.base_path)
+        if route is not None:
+            self.routes.setdefault(route, []).append(filepath)
+
+
+def build_file_index(base_path: Path) -> FileIndex:
     """Index every doc file under base_path by lowercased stem, for anchor lookup."""
-    file_index: dict[str, list[str]] = {}
-    for dirpath, _, filenames in os.walk(base_path):
-        for fn in filenames:
-            filepath = os.path.join(dirpath, fn)
-            if not _should_include(filepath):
-                continue
-            stem = Path(fn).stem.lower()
-            file_index.setdefault(stem, []).append(filepath)
+    file_index = FileIndex(base_path)
+    for doc in load_doc_index(base_path).files:
+        if is_content_file(doc.path):
+            file_index.add(doc.path, doc.route)
     return file_index
 
 
@@ -127,7 +146,26 @@ def _is_market_hours_symbol(base_path: Path, url: str, anchor: str) -> bool:
     return anchor in _get_market_hours_symbols(base_path, m.group(1))
 
 
-def check_section_anchor(url: str, base_path: Path, file_index: dict[str, list[str]],
+def _section_names(url: str) -> tuple[str, str, str]:
+    """Split a URL's #fragment into (fragment, section name, raw section name)."""
+    section = url.split("#", 1)[1]
+    section_name_raw = section.replace("-", " ")
+    return section, apply_replacements(section_name_raw), section_name_raw
+
+
+def anchor_stems(url: str) -> set[str]:
+    """The lowercased file stems a URL's #section anchor can resolve to.
+
+    Empty when check_section_anchor doesn't apply to the URL. Used to find the
+    anchors affected by an added, deleted or renamed section file.
+    """
+    if "/docs/v2" not in url or "api-reference" in url or "#" not in url:
+        return set()
+    _, section_name, section_name_raw = _section_names(url)
+    return {section_name.lower(), section_name_raw.lower()}
+
+
+def check_section_anchor(url: str, base_path: Path, file_index: FileIndex | dict[str, list[str]],
                          edge_case_urls: frozenset = EDGE_CASE_URLS,
                          path_aliases: tuple = ()) -> str | None:
     """Validate a /docs/v2 URL's #section anchor against the docs files on disk.
@@ -157,14 +195,14 @@ def check_section_anchor(url: str, base_path: Path, file_index: dict[str, list[s
             if old in variant:
                 expected_variants.add(variant.replace(old, new))
 
-    section = url.split("#", 1)[1]
-    section_name_raw = section.replace("-", " ")
-    section_name = apply_replacements(section_name_raw)
+    section, section_name, section_name_raw = _section_names(url)
 
     # Look up files matching the section name (try with replacements first, then raw).
-    candidates = file_index.get(section_name.lower(), [])
+    stem = section_name.lower()
+    candidates = file_index.get(stem, [])
     if not candidates:
-        candidates = file_index.get(section_name_raw.lower(), [])
+        stem = section_name_raw.lower()
+        candidates = file_index.get(stem, [])
 
     if not candidates:
         if "/market-hours#" in url and _is_market_hours_symbol(base_path, url, section):
@@ -172,19 +210,13 @@ def check_section_anchor(url: str, base_path: Path, file_index: dict[str, list[s
         return f'No Section "{section_name}" was found'
 
     # A candidate file must also sit under the path implied by the URL.
-    for candidate in candidates:
-        rel = os.path.relpath(candidate, base_path).replace("\\", os.sep)
-        parts = rel.replace("\\", "/").split("/")
-        numbered = [p for p in parts if p and p[0].isdigit() and " " in p]
-        if not numbered:
-            continue
-        non_numbered_path = os.sep.join(
-            p[p.index(" ") + 1:].strip() for p in numbered[:-1]
-        )
-        section_part = Path(numbered[-1]).stem
-        full = f"{non_numbered_path}{os.sep}{section_part}".lower()
-        if full in expected_variants:
+    if isinstance(file_index, FileIndex):
+        if any(Path(f).stem.lower() == stem
+               for variant in expected_variants
+               for f in file_index.routes.get(variant, ())):
             return None
+    elif any(file_route(c, base_path) in expected_variants for c in candidates):
+        return None
 
     if "/market-hours#" in url and _is_market_hours_symbol(base_path, url, section):
         return None
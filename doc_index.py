@@ -0,0 +1,246 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Shared index of the files in the docs tree, used by the repo tools (url_check.py,
+# external_url_check.py, namespace_remover.py, code-generators/, examples-check/)
+# instead of each walking the whole tree on its own.
+#
+# The index is kept in a gzipped JSON file in this repo's .doc_index_cache directory
+# (its own directory, so rewriting it doesn't touch the root's mtime); a sub-tree of
+# the repo gets its own file there. Trees outside the repo (cloned repos, temp trees)
+# are indexed without a cache file, since this repo doesn't own them. Per
+# directory, it stores the directory's mtime, its sub-directories, and per file the
+# size, mtime, content hash, stem and de-numbered route (see file_route()).
+#
+# On load, a directory whose mtime is unchanged reuses its cached listing (adding,
+# removing or renaming an entry always bumps the parent's mtime); only directories
+# whose mtime changed are listed again. Files are still stat()ed, so an edited file
+# drops its content hash, which is recomputed lazily the next time it's asked for -
+# Resources/ alone is hundreds of MB, so nothing is hashed up front.
+#
+#   from doc_index import load_doc_index
+#   index = load_doc_index(Path("."))
+#   for doc in index.files_with_suffix(".html", ".php"): ...
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+CACHE_DIR = ".doc_index_cache"
+CACHE_NAME = "index.json.gz"
+CACHE_VERSION = 1
+SKIP_DIRS = {".git", CACHE_DIR}
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+
+def _cache_file(base_path: Path) -> Path | None:
+    """The cache file of base_path's index, None if base_path is outside this repo."""
+    base = Path(base_path).resolve()
+    if base == REPO_ROOT:
+        return REPO_ROOT / CACHE_DIR / CACHE_NAME
+    if REPO_ROOT not in base.parents:
+        return None
+    rel = base.relative_to(REPO_ROOT).as_posix()
+    return REPO_ROOT / CACHE_DIR / f"{hashlib.sha1(rel.encode()).hexdigest()[:12]}.{CACHE_NAME}"
+
+
+def file_route(filepath: str, base_path: Path) -> str | None:
+    """The de-numbered, lowercased route of a doc file, as a docs URL spells it.
+
+    "03 Writing Algorithms/.../05 Alpaca/06 Fees.html" -> "writing algorithms/.../
+    alpaca/06 fees" (os.sep-separated). Only numbered path parts count; None when
+    there are none.
+    """
+    rel = os.path.relpath(filepath, base_path).replace("\\", os.sep)
+    parts = rel.replace("\\", "/").split("/")
+    numbered = [p for p in parts if p and p[0].isdigit() and " " in p]
+    if not numbered:
+        return None
+    non_numbered_path = os.sep.join(
+        p[p.index(" ") + 1:].strip() for p in numbered[:-1]
+    )
+    section_part = Path(numbered[-1]).stem
+    return f"{non_numbered_path}{os.sep}{section_part}".lower()
+
+
+class DocFile(NamedTuple):
+    """One indexed file. `path` is base_path-joined, like os.walk() would yield it."""
+    path: str
+    size: int
+    mtime_ns: int
+    sha1: str | None     # None until DocIndex.content_hash() computes it
+    stem: str            # lowercased
+    route: str | None    # file_route(), None for non-numbered paths
+
+
+class DocIndex:
+    """The files under base_path, in (directory, file name) order."""
+
+    def __init__(self, base_path: Path, dirs: dict[str, dict], dirty: bool):
+        self.base_path = base_path
+        self._dirs = dirs
+        self._dirty = dirty
+        self.files: list[DocFile] = []
+        for rel in sorted(dirs, key=lambda d: os.path.join(str(base_path), d)):
+            dirpath = os.path.join(str(base_path), rel)
+            for name in sorted(dirs[rel]["files"]):
+                size, mtime_ns, sha1, stem, route = dirs[rel]["files"][name]
+                self.files.append(DocFile(os.path.join(dirpath, name), size, mtime_ns,
+                                          sha1, stem, route))
+
+    def files_with_suffix(self, *suffixes: str) -> list[DocFile]:
+        """The indexed files whose name ends with one of `suffixes` (case-insensitive)."""
+        suffixes = tuple(s.lower() for s in suffixes)
+        return [f for f in self.files if f.path.lower().endswith(suffixes)]
+
+    def content_hash(self, doc: DocFile) -> str:
+        """SHA-1 of a file's content; computed on first use and kept by save()."""
+        if doc.sha1:
+            return doc.sha1
+        h = hashlib.sha1()
+        with open(doc.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        rel_dir, name = os.path.split(os.path.relpath(doc.path, self.base_path))
+        entry = self._dirs.get("" if rel_dir == "." else rel_dir, {}).get("files", {}).get(name)
+        if entry is not None:
+            entry[2] = h.hexdigest()
+            self._dirty = True
+        return h.hexdigest()
+
+    def save(self):
+        """Write the index back to its cache file, if anything changed since load."""
+        cache_file = _cache_file(self.base_path)
+        if not self._dirty or cache_file is None:
+            return
+        data = json.dumps({"version": CACHE_VERSION, "base": str(self.base_path.resolve()),
+                           "dirs": self._dirs}, separators=(",", ":"))
+        tmp = None
+        try:
+            cache_file.parent.mkdir(exist_ok=True)
+            # A temp file of its own, so tools saving at the same time don't write
+            # into each other's file; the last os.replace() wins.
+            with tempfile.NamedTemporaryFile(dir=cache_file.parent, prefix=cache_file.name,
+                                             suffix=".tmp", delete=False) as f:
+                tmp = f.name
+                with gzip.open(f, "wt", encoding="utf-8", compresslevel=1) as gz:
+                    gz.write(data)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"Could not write {cache_file}: {e}")
+            if tmp is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp)
+            return
+        self._dirty = False
+
+
+def _read_cache(base_path: Path) -> dict[str, dict]:
+    cache_file = _cache_file(base_path)
+    if cache_file is None:
+        return {}
+    try:
+        with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError, EOFError):
+        return {}
+    if data.get("version") != CACHE_VERSION or data.get("base") != str(base_path.resolve()):
+        return {}
+    return data["dirs"]
+
+
+def _list_dir(dirpath: str) -> tuple[list[str], list[str]]:
+    subdirs, names = [], []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.name)
+                elif entry.is_file():
+                    names.append(entry.name)
+    except OSError:
+        pass
+    return subdirs, names
+
+
+def load_doc_index(base_path: Path, use_cache: bool = True) -> DocIndex:
+    """Index every file under base_path (skipping .git), revalidating the cached index.
+
+    The refreshed index is saved back right away; call DocIndex.save() again after
+    content_hash() to keep the computed hashes.
+    """
+    base_path = Path(base_path)
+    cached = _read_cache(base_path) if use_cache else {}
+    dirs: dict[str, dict] = {}
+    dirty = False
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        dirpath = os.path.join(str(base_path), rel)
+        try:
+            mtime_ns = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            dirty = True
+            continue
+        old = cached.get(rel)
+        if old is not None and old["mtime"] == mtime_ns:
+            subdirs, names = old["subdirs"], list(old["files"])
+            old_files = old["files"]
+        else:
+            subdirs, names = _list_dir(dirpath)
+            old_files = old["files"] if old is not None else {}
+            dirty = True
+
+        files = {}
+        for name in names:
+            filepath = os.path.join(dirpath, name)
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                dirty = True
+                continue
+            entry = old_files.get(name)
+            if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+                entry = [st.st_size, st.st_mtime_ns, None, Path(name).stem.lower(),
+                         file_route(filepath, base_path)]
+                dirty = True
+            files[name] = entry
+        dirs[rel] = {"mtime": mtime_ns, "subdirs": subdirs, "files": files}
+        stack.extend(os.path.join(rel, d) for d in subdirs)
+
+    dirty = dirty or cached.keys() != dirs.keys()
+    index = DocIndex(base_path, dirs, dirty)
+    if use_cache:
+        index.save()
+    return index
+
+
+def list_doc_files(root: Path, *suffixes: str) -> list[Path]:
+    """Sorted paths of the files under `root` with one of `suffixes`.
+
+    A root inside this repo is served from the repo-wide index, so every tool
+    shares (and keeps warm) one cache file.
+    """
+    root = Path(root).resolve()
+    base = REPO_ROOT if root == REPO_ROOT or REPO_ROOT in root.parents else root
+    index = load_doc_index(base)
+    prefix = str(root) + os.sep
+    return sorted(Path(f.path) for f in index.files_with_suffix(*suffixes)
+                  if root == base or f.path.startswith(prefix))
@@ -1,11 +1,16 @@
 """API client for QuantConnect API interactions."""
 import base64
 import hashlib
+import sys
 import time
+from pathlib import Path
 import requests
-from ratelimit import limits, sleep_and_retry
 
 from config import Config
+from rate_limiter import Priority, TokenBucket
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from poller import Poller  # noqa: E402
 
 
 class APIClient:
@@ -15,6 +20,13 @@ class APIClient:
         self._user_id = Config.USER_ID
         self._user_token = Config.USER_TOKEN
         self._base_api = Config.BASE_API
+        # Shared by the worker processes that inherit this client.
+        self._rate_limiter = TokenBucket(
+            Config.CALLS, Config.RATE_LIMIT, Config.RATE_BURST
+        )
+        # One poller per kind of job, so each learns how long they take.
+        self._compile_poller = Poller(*Config.COMPILE_POLL)
+        self._backtest_poller = Poller(*Config.BACKTEST_POLL)
 
     def _get_headers(self):
         """Generate authentication headers for API requests."""
@@ -35,10 +47,9 @@ class APIClient:
             'Timestamp': timestamp
         }
 
-    @sleep_and_retry
-    @limits(calls=Config.CALLS, period=Config.RATE_LIMIT)
-    def _post(self, endpoint, payload={}):
+    def _post(self, endpoint, payload={}, priority=Priority.WRITE):
         """Make a rate-limited POST request to the API."""
+        self._rate_limiter.acquire(priority)
         return requests.post(
             f"{self._base_api}/{endpoint}",
             headers=self._get_headers(),
@@ -54,6 +65,14 @@ class APIClient:
         print("API Authentication Failed.")
         return False
 
+    def read_lean_version(self):
+        """Get the Id of the latest LEAN version, None if it can't be read."""
+        response = self._post("lean/versions/read")
+        versions = response.get("versions") if response.get("success") else None
+        if not versions:
+            return None
+        return max(version["id"] for version in versions)
+
     def create_project(self, name, language):
         """Create a new project and return the project Id."""
         return self._post(
@@ -75,16 +94,19 @@ class APIClient:
     def compile_project(self, project_id):
         """Compile a project and return the compile ID."""
         response = self._post("compile/create", {"projectId": project_id})
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            if response.get("state") == "BuildError":
-                return None
-            response = self._post(
+        if not response.get("success") or response.get("state") == "BuildError":
+            return None
+        compile_id = response["compileId"]
+        response = self._compile_poller.poll(
+            lambda: self._post(
                 "compile/read", 
-                {"projectId": project_id, "compileId": response["compileId"]}
-            )
-            if response.get("success") and response.get("state") == "BuildSuccess":
-                return response["compileId"]
-            time.sleep(1)
+                {"projectId": project_id, "compileId": compile_id},
+                Priority.READ
+            ),
+            lambda r: r.get("state") in ("BuildSuccess", "BuildError")
+        )
+        if response and response.get("success") and response.get("state") == "BuildSuccess":
+            return compile_id
         return None
 
     def create_backtest(self, project_id, compile_id, backtest_name):
@@ -106,22 +128,32 @@ class APIClient:
     def read_backtest(self, project_id, backtest_id):
         """Read backtest results, waiting for completion."""
         errors = 0
-        while True:
-            response = self._post(
-                "backtests/read", 
-                {"projectId": project_id, "backtestId": backtest_id}
-            )
+
+        def is_done(response):
+            nonlocal errors
             if not response.get("success"):
                 errors += 1
-                if errors >= Config.MAX_RETRY_ATTEMPTS:
-                    return None
-                continue
-            backtest = response["backtest"]
-            if isinstance(backtest, list):
-                backtest = backtest[0]
-            if backtest.get("completed"):
-                break
-            time.sleep(10)
+                return errors >= Config.MAX_RETRY_ATTEMPTS
+            return self._backtest(response).get("completed")
+
+        response = self._backtest_poller.poll(
+            lambda: self._post(
+                "backtests/read", 
+                {"projectId": project_id, "backtestId": backtest_id},
+                Priority.READ
+            ),
+            is_done,
+            lambda r: self._backtest(r).get("progress") if r.get("success") else None
+        )
+        if not response or not response.get("success"):
+            return None
+        return self._backtest(response)
+
+    def _backtest(self, response):
+        """Get the backtest of a backtests/read response."""
+        backtest = response["backtest"]
+        if isinstance(backtest, list):
+            backtest = backtest[0]
         return backtest
 
     def read_backtest_logs(
@@ -135,9 +167,49 @@ class APIClient:
                 'start': start,
                 'end': end,
                 'query': query
-            }
+            },
+            Priority.READ
         )
 
+    def iter_backtest_logs(self, project_id, backtest_id, first_page=None):
+        """
+        Stream a backtest's log lines, reading a page at a time.
+
+        The next page is only read once the caller consumed the lines
+        before it, so a caller that stops early skips the rest of the log.
+
+        Args:
+            project_id: Id of the backtest's project
+            backtest_id: Id of the backtest
+            first_page: Response of an earlier read of the first page
+                (start=0, end=Config.LOG_PAGE_SIZE), to not read it again
+
+        Yields:
+            The log lines, in order.
+
+        Raises:
+            RuntimeError: A page couldn't be read.
+        """
+        start = 0
+        response = first_page
+        while True:
+            if response is None:
+                response = self.read_backtest_logs(
+                    project_id, backtest_id,
+                    start=start, end=start + Config.LOG_PAGE_SIZE
+                )
+            if not response.get("success"):
+                raise RuntimeError(
+                    f"Read backtest logs failed at line {start}. "
+                    f"Response={response}"
+                )
+            lines = response.get("logs") or []
+            yield from lines
+            start += len(lines)
+            if not lines or start >= response.get("length", 0):
+                return
+            response = None
+
     def read_backtest_orders(self, project_id, backtest_id, start=0, end=99):
         """Read backtest orders."""
         return self._post(
@@ -147,7 +219,8 @@ class APIClient:
                 "end": end,
                 "projectId": project_id,
                 "backtestId": backtest_id
-            }
+            },
+            Priority.READ
         )
     
     def check_python_syntax(self, content):
@@ -1,17 +1,43 @@
 """Backtest execution and validation."""
-import time
+import re
+import sys
+from pathlib import Path
 
+from cache import content_hash
 from config import Config
 from utils import Language
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from poller import Poller  # noqa: E402
+
+
+# All the error queries in one pattern, so each log line is matched once.
+ERROR_LOG_PATTERN = re.compile(
+    '|'.join(re.escape(query) for query in Config.ERROR_LOG_QUERIES if query)
+)
+
+
+class BacktestError(Exception):
+    """A step of a backtest failed; the message says which."""
+
 
 class BacktestResult:
     """Result of a backtest execution."""
 
-    def __init__(self, success, error_message, statistics={}):
+    def __init__(
+            self, success, error_message, statistics={}, failed_queries=[]):
         self.success = success
         self.error_message = error_message
         self.statistics = statistics
+        self.failed_queries = failed_queries
+
+    @property
+    def order_count(self):
+        """Number of orders the backtest placed, None if unknown."""
+        try:
+            return int(self.statistics.get("Total Orders"))
+        except (TypeError, ValueError):
+            return None
 
 
 class BacktestRunner:
@@ -23,14 +49,52 @@ class BacktestRunner:
     }
 
     def __init__(
-            self, api_client, compiler_by_langugage, project_id_by_language):
-        """Initialize backtest runner."""
+            self, api_client, compiler_by_langugage, project_id_by_language,
+            compile_ids=None):
+        """
+        Initialize backtest runner.
+
+        Args:
+            api_client: APIClient to call the API with
+            compiler_by_langugage: Dictionary mapping Language to compiler
+            project_id_by_language: Dictionary mapping Language to the Id
+                of the project to backtest in
+            compile_ids: Dictionary mapping a project Id and a hash of the
+                code to the (project Id, compile Id) that compiled it, so
+                identical code is compiled once per project. Pass a shared
+                dictionary (e.g. from a multiprocessing Manager) to share
+                compiles between runners of the same projects.
+        """
         self._api_client = api_client
         self._compiler_by_langugage = compiler_by_langugage
         self._project_id_by_language = project_id_by_language
+        self._compile_ids = {} if compile_ids is None else compile_ids
+        self._log_poller = Poller(*Config.LOG_POLL)
+        self._statistics_poller = Poller(*Config.STATISTICS_POLL)
 
     def run_backtest(self, code_block):
         """Execute a backtest and return results."""
+        try:
+            compiled = self.compile(code_block)
+            backtest_id = self.start_backtest(code_block, compiled)
+        except BacktestError as e:
+            return BacktestResult(False, str(e))
+        return self.wait_for_backtest(compiled[0], backtest_id)
+
+    def compile(self, code_block):
+        """
+        Upload the code block to its project and compile it, unless the
+        same code was compiled in the project before.
+
+        Once a backtest of the compile has started, the project can take
+        the next code block.
+
+        Returns:
+            Tuple of the project Id and the compile Id.
+
+        Raises:
+            BacktestError: The upload or the compile failed.
+        """
         # Get the project Id.
         project_id = self._project_id_by_language[code_block.language]
         # Clean and prepare code.
@@ -38,6 +102,12 @@ class BacktestRunner:
         code = compiler.prepare_for_backtest(
             compiler.clean_code(code_block.code)
         )
+        # Keyed by project too, so a runner never backtests a compile of
+        # another runner's project.
+        key = (project_id, content_hash(code_block.language.value, code))
+        compiled = self._compile_ids.get(key)
+        if compiled:
+            return compiled
 
         #print(f'{datetime.now()} -- Starting test for {code_block}')
 
@@ -46,12 +116,12 @@ class BacktestRunner:
             project_id, self._file_name[code_block.language], code
         )
         if not success:
-            return BacktestResult(False, "Update project content failed")
+            raise BacktestError("Update project content failed")
 
         # Compile the project.
         compile_id = self._api_client.compile_project(project_id)
         if not compile_id:
-            return BacktestResult(False, "Compile project failed")
+            raise BacktestError("Compile project failed")
 
         ## Check the syntax.
         #if language == Language.PYTHON:
@@ -59,88 +129,146 @@ class BacktestRunner:
         #    if syntax_error:
         #        return BacktestResult(False, f"Syntax error: {syntax_error}")
 
+        self._compile_ids[key] = (project_id, compile_id)
+        return project_id, compile_id
+
+    def start_backtest(self, code_block, compiled):
+        """
+        Create a backtest of a compile.
+
+        Args:
+            code_block: The CodeBlock that was compiled
+            compiled: Tuple of the project Id and compile Id from compile
+
+        Returns:
+            The backtest Id.
+
+        Raises:
+            BacktestError: The backtest couldn't be created.
+        """
+        project_id, compile_id = compiled
         # Create a backtest.
         response = self._api_client.create_backtest(
             project_id, compile_id, code_block.get_backtest_name()
         )
         if not response.get("success"):
-            return BacktestResult(
-                False, f"Create backtest failed. Reponse={response}"
+            raise BacktestError(
+                f"Create backtest failed. Reponse={response}"
             )
-        backtest_id = response["backtest"]["backtestId"]
-        
+        return response["backtest"]["backtestId"]
+
+    def wait_for_backtest(self, project_id, backtest_id):
+        """Wait for a backtest to finish, then validate it and return results."""
         # Read the backtest results.
         backtest = self._api_client.read_backtest(project_id, backtest_id)
         if not backtest:
             return BacktestResult(False, "Read backtest failed")
 
         # Ensure the backtest finished without error.
-        is_valid, error_msg = self._validate_backtest(
+        is_valid, error_msg, failed_queries = self._validate_backtest(
             backtest, project_id, backtest_id
         )
         if not is_valid:
-            return BacktestResult(False, error_msg)
+            return BacktestResult(False, error_msg, failed_queries=failed_queries)
 
         # Get the backtest statistics.
         statistics = self._get_statistics(backtest, project_id, backtest_id)
         if not statistics:
             return BacktestResult(False, "No statistics returned")
 
-        return BacktestResult(True, "", statistics)
+        return BacktestResult(True, "", statistics, failed_queries)
 
     def _validate_backtest(self, backtest, project_id, backtest_id):
-        """Validate backtest for errors and warnings."""
+        """
+        Validate backtest for errors and warnings.
+
+        Returns:
+            Tuple of whether the backtest is valid, the error message and
+            the log queries that matched.
+        """
         # Check for errors
         if backtest.get('error'):
-            return False, f'Backtest error: {backtest["error"]}'
+            return False, f'Backtest error: {backtest["error"]}', []
 
         # Check for stacktrace
         if backtest.get('stacktrace'):
-            return False, f'Backtest stacktrace: {backtest["stacktrace"]}'
+            return False, f'Backtest stacktrace: {backtest["stacktrace"]}', []
 
         # Check logs
-        if not self._logs_are_available(project_id, backtest_id):
-            return False, "Logs didn't load in time"
-        failed_queries = self._scan_logs(project_id, backtest_id)
+        first_page = self._read_first_log_page(project_id, backtest_id)
+        if not first_page:
+            return False, "Logs didn't load in time", []
+        try:
+            failed_queries = self._scan_logs(
+                project_id, backtest_id, first_page
+            )
+        except RuntimeError as e:
+            return False, str(e), []
         if failed_queries:
-            return False, f'Failed queries: {failed_queries}'
+            return False, f'Failed queries: {failed_queries}', failed_queries
 
-        return True, ""
+        return True, "", failed_queries
 
-    def _logs_are_available(self, project_id, backtest_id):
-        """Check if logs are available."""
-        for _ in range(Config.MAX_LOG_ATTEMPTS):
-            response = self._api_client.read_backtest_logs(
-                project_id, backtest_id, start=0, end=1
+    def _read_first_log_page(self, project_id, backtest_id):
+        """Wait for the logs to be available and read their first page."""
+        return self._log_poller.poll(
+            lambda: self._api_client.read_backtest_logs(
+                project_id, backtest_id, start=0, end=Config.LOG_PAGE_SIZE
+            ),
+            lambda r: r.get("success") and r.get('length')
+        )
+
+    def _scan_logs(self, project_id, backtest_id, first_page):
+        """
+        Scan logs for error patterns.
+
+        The log is streamed a page at a time and the scan stops once every
+        error query matched, or once the log is known to be too long, so a
+        noisy backtest doesn't download its whole log.
+
+        Returns:
+            The failing queries of Config.ERROR_LOG_QUERIES, in its order:
+            the error queries found in the scanned lines, and '' if the log
+            has too many lines.
+
+        Raises:
+            RuntimeError: A page of the log couldn't be read.
+        """
+        # The first page says how long the whole log is. A log that's too
+        # long fails anyway, so only the page already read is scanned.
+        too_long = first_page.get('length', 0) > Config.MAX_LOG_LINES
+        if too_long:
+            lines = first_page.get('logs') or []
+        else:
+            lines = self._api_client.iter_backtest_logs(
+                project_id, backtest_id, first_page
             )
-            if response.get("success") and response.get('length'):
-                return True
-            time.sleep(5)
-        return False
-
-    def _scan_logs(self, project_id, backtest_id):
-        """Scan logs for error patterns."""
-        failed_queries = []
-        for query in Config.ERROR_LOG_QUERIES:
-            log_lines = self._api_client.read_backtest_logs(
-                project_id, backtest_id, query
-            ).get('length', 0)
-            # Check if query matched or if too many log lines
-            if (query and log_lines or 
-                not query and log_lines > Config.MAX_LOG_LINES):
-                failed_queries.append(query)
-        return failed_queries
+        queries = [query for query in Config.ERROR_LOG_QUERIES if query]
+        found = set()
+        for line in lines:
+            # The pattern only tells whether the line has an error; a line
+            # can have more than one.
+            if ERROR_LOG_PATTERN.search(line):
+                found.update(query for query in queries if query in line)
+                if len(found) == len(queries):
+                    break
+        failed_queries = [query for query in queries if query in found]
+        return failed_queries + [''] if too_long else failed_queries
 
     def _get_statistics(self, backtest, project_id, backtest_id):
         """Get backtest statistics."""
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            statistics = backtest.get("statistics")
-            if isinstance(statistics, list) and statistics:
-                statistics = statistics[0]
-            if statistics:
-                return statistics
-            time.sleep(5)
-            backtest = self._api_client.read_backtest(project_id, backtest_id)
-            if not backtest:
-                break
-        return None
+        statistics = self._statistics(backtest)
+        if statistics:
+            return statistics
+        backtest = self._statistics_poller.poll(
+            lambda: self._api_client.read_backtest(project_id, backtest_id),
+            lambda b: not b or self._statistics(b)
+        )
+        return self._statistics(backtest) if backtest else None
+
+    def _statistics(self, backtest):
+        """Get the statistics of a backtest, None if they aren't ready."""
+        statistics = backtest.get("statistics")
+        if isinstance(statistics, list) and statistics:
+            statistics = statistics[0]
+        return statistics or None
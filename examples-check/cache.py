@@ -0,0 +1,222 @@
+"""Persistent cache of extracted code snippets, fragment compile results and
+backtest runtimes and results."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from config import Config
+
+
+# Bump when the extraction or the stored layout changes, to drop old entries.
+CACHE_VERSION = 2
+
+
+def content_hash(*parts):
+    """SHA-1 of the given strings, as a hex digest."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class ExamplesCache:
+    """
+    SQLite store that lets a regression run skip unchanged work.
+
+    - pages: the code snippets extracted from each documentation page,
+      keyed by the page's content hash. For a PHP page, the content
+      hashes of the files it included when it was rendered are stored
+      too, so editing a shared resource re-extracts every page that
+      includes it.
+    - fragments: the code fragments that compiled without errors, keyed
+      by a hash of the language, compiler version and code. Failures
+      aren't stored, so they are always re-checked and reported.
+    - runtimes: how long the last backtest of each code block took,
+      keyed by the block's location and code (see runtime_key), so the
+      longest backtests can be scheduled first.
+    - results: the outcome of each backtest that passed or failed the
+      log scan, keyed by the code as it's backtested and the LEAN version
+      (see result_key), so unchanged examples aren't backtested again.
+      A failed scan is stored with the log queries that matched, so it's
+      reported again with them.
+    """
+
+    def __init__(self, cache_dir=Config.CACHE_DIR):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            cache_dir: Directory of the database file
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'examples_check.sqlite'))
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != CACHE_VERSION:
+            tables = self._db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+            for (table,) in tables:
+                self._db.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self._db.execute(f'PRAGMA user_version = {CACHE_VERSION}')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' path TEXT PRIMARY KEY, page_hash TEXT, dependencies TEXT, snippets TEXT)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS fragments ('
+            ' key TEXT PRIMARY KEY, checked_at REAL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS runtimes ('
+            ' key TEXT PRIMARY KEY, code_hash TEXT, seconds REAL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' key TEXT PRIMARY KEY, statistics TEXT, failed_queries TEXT,'
+            ' order_count INTEGER, checked_at REAL)'
+        )
+
+    def get_snippets(self, path, page_hash, file_hash):
+        """
+        Get the cached snippets of a page, if the page is unchanged.
+
+        Args:
+            path: Path of the page
+            page_hash: Current content hash of the page
+            file_hash: Function returning the current content hash of a
+                dependency path (None if the file no longer exists)
+
+        Returns:
+            The snippets stored by put_snippets, or None on a cache miss.
+        """
+        row = self._db.execute(
+            'SELECT page_hash, dependencies, snippets FROM pages WHERE path = ?',
+            (path,)
+        ).fetchone()
+        if not row or row[0] != page_hash:
+            return None
+        for dependency, dependency_hash in json.loads(row[1]).items():
+            if file_hash(dependency) != dependency_hash:
+                return None
+        return json.loads(row[2])
+
+    def put_snippets(self, path, page_hash, dependencies, snippets):
+        """
+        Store the snippets extracted from a page.
+
+        Args:
+            path: Path of the page
+            page_hash: Content hash of the page
+            dependencies: Dictionary mapping each file the page included
+                to its content hash
+            snippets: JSON-serializable list of the extracted snippets
+        """
+        self._db.execute(
+            'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+            (path, page_hash, json.dumps(dependencies), json.dumps(snippets))
+        )
+
+    def fragment_key(self, compiler, language, code):
+        """Cache key of a code fragment for the given compiler."""
+        return content_hash(language.value, compiler.version, code)
+
+    def has_passed(self, key):
+        """Check if the fragment with this key compiled without errors before."""
+        return self._db.execute(
+            'SELECT 1 FROM fragments WHERE key = ?', (key,)
+        ).fetchone() is not None
+
+    def add_passed(self, key):
+        """Record that the fragment with this key compiled without errors."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO fragments VALUES (?, ?)', (key, time.time())
+        )
+
+    def runtime_key(self, code_block):
+        """Cache key of a code block's backtest runtime."""
+        return content_hash(
+            code_block.path, str(code_block.div_idx), str(code_block.pre_idx),
+            content_hash(code_block.code)
+        )
+
+    def get_runtime(self, code_block):
+        """
+        Get how long the code block's last backtest took.
+
+        Args:
+            code_block: The CodeBlock to look up
+
+        Returns:
+            The runtime in seconds. If the block wasn't backtested at this
+            location, the longest runtime of the same code elsewhere (e.g.
+            before a snippet was added above it). None if the code was
+            never backtested.
+        """
+        row = self._db.execute(
+            'SELECT seconds FROM runtimes WHERE key = ?',
+            (self.runtime_key(code_block),)
+        ).fetchone()
+        if row is None:
+            row = self._db.execute(
+                'SELECT MAX(seconds) FROM runtimes WHERE code_hash = ?',
+                (content_hash(code_block.code),)
+            ).fetchone()
+        return row[0]
+
+    def add_runtime(self, code_block, seconds):
+        """Record how long the code block's backtest took."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO runtimes VALUES (?, ?, ?)',
+            (self.runtime_key(code_block), content_hash(code_block.code), seconds)
+        )
+
+    def result_key(self, compiler, code_block, lean_version):
+        """
+        Cache key of a code block's backtest result.
+
+        The code is normalized the way it's sent to the backtest, and
+        trailing whitespace is dropped, so edits that don't change what
+        runs keep the key.
+        """
+        code = compiler.prepare_for_backtest(compiler.clean_code(code_block.code))
+        code = '\n'.join(line.rstrip() for line in code.strip().splitlines())
+        return content_hash(code_block.language.value, str(lean_version), code)
+
+    def get_result(self, key):
+        """
+        Get the stored result of a backtest.
+
+        Returns:
+            Dictionary with the backtest's statistics, failed_queries (the
+            log scan queries that matched, empty if it passed) and
+            order_count, or None if no result of this code is stored for
+            this LEAN version.
+        """
+        row = self._db.execute(
+            'SELECT statistics, failed_queries, order_count FROM results'
+            ' WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'statistics': json.loads(row[0]),
+            'failed_queries': json.loads(row[1]),
+            'order_count': row[2]
+        }
+
+    def put_result(self, key, statistics, failed_queries, order_count):
+        """Store the result of a backtest that passed or failed the log scan."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+            (
+                key, json.dumps(statistics), json.dumps(failed_queries),
+                order_count, time.time()
+            )
+        )
+
+    def close(self):
+        """Save the changes and close the database."""
+        self._db.commit()
+        self._db.close()
@@ -25,6 +25,28 @@ class Compiler(ABC):
         """
         pass
 
+    def compile_fragments(self, codes):
+        """
+        Compile many code fragments.
+
+        Subclasses can override this to check the fragments in batches.
+
+        Returns:
+            List with the error message of each fragment, None for the
+            fragments that compile.
+        """
+        return [self.compile_fragment(code) for code in codes]
+
+    @property
+    @abstractmethod
+    def version(self):
+        """
+        Identify the toolchain and settings that compile_fragment uses.
+
+        Cached compile results are only reused for the same version.
+        """
+        pass
+
     def has_date_range(self, code):
         """Check if code has start and end dates."""
         return all(pattern in code for pattern in self.DATE_RANGE_PATTERNS)
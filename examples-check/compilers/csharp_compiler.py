@@ -1,8 +1,13 @@
 """C# code compilation and validation."""
+import json
 import os
+import re
 import subprocess
+from functools import cached_property
 
+from cache import content_hash
 from compilers.compiler import Compiler
+from config import Config
 
 
 class CSharpCompiler(Compiler):
@@ -85,7 +90,7 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
         <TargetFramework>net9.0</TargetFramework>
         <OutputPath>bin/$(Configuration)</OutputPath>
         <AppendTargetFrameworkToOutputPath>false</AppendTargetFrameworkToOutputPath>
-        <DefaultItemExcludes>$(DefaultItemExcludes);backtests/*/code/**;live/*/code/**;optimizations/*/code/**</DefaultItemExcludes>
+        <DefaultItemExcludes>$(DefaultItemExcludes);backtests/*/code/**;live/*/code/**;optimizations/*/code/**;batch/**</DefaultItemExcludes>
         <NoWarn>CS0618</NoWarn>
     </PropertyGroup>
     <ItemGroup>
@@ -95,10 +100,47 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
 </Project>
 """
 
+    # Errors of the batch build, e.g.
+    # "/mnt/ramdisk/batch/Fragment12.cs(20,13): error CS0103: ..."
+    FRAGMENT_ERROR_PATTERN = re.compile(r'Fragment(\d+)\.cs\(\d+,\d+\): error ')
+
     def __init__(self):
-        """Initialize the compiler and write the csproj file once."""
+        """Initialize the compiler and write the csproj files once."""
         with open(f"{self._ramdisk_path}/project.csproj", "w") as f:
             f.write(self.PROJECT_FILE)
+        # A second project, in a sub-directory the first one excludes, to
+        # compile fragments in batches.
+        self._batch_path = f"{self._ramdisk_path}/batch"
+        os.makedirs(self._batch_path, exist_ok=True)
+        with open(f"{self._batch_path}/project.csproj", "w") as f:
+            f.write(self.PROJECT_FILE)
+
+    @cached_property
+    def version(self):
+        """
+        The .NET SDK and restored LEAN package versions, plus a hash of the
+        usings and project file.
+        """
+        sdk = subprocess.run(
+            ['dotnet', '--version'], capture_output=True, text=True, env=self._env()
+        ).stdout.strip()
+        # The project references floating package versions (2.5.*), so
+        # restore it to see which ones a build would use.
+        subprocess.run(
+            ['dotnet', 'restore', '.', '-v:q'],
+            cwd=self._ramdisk_path, capture_output=True, env=self._env()
+        )
+        try:
+            assets_path = f"{self._ramdisk_path}/obj/project.assets.json"
+            with open(assets_path, 'r', encoding='utf-8') as f:
+                libraries = json.load(f)['libraries']
+            packages = ', '.join(sorted(
+                name for name in libraries if name.startswith('QuantConnect.')
+            ))
+        except (OSError, ValueError, KeyError):
+            packages = 'unknown'
+        settings = content_hash(self.IMPORTS, self.PROJECT_FILE)
+        return f'dotnet {sdk}; {packages}; settings {settings[:12]}'
 
     def compile_fragment(self, code):
         """
@@ -111,7 +153,65 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
         with open(f"{self._ramdisk_path}/test.cs", "w") as f:
             f.write(self.prepare_for_backtest(code))
         # Compile it.
-        proc = subprocess.run(
+        proc = self._build(self._ramdisk_path)
+        # Return the errors if there are any.
+        if proc.returncode:
+            return proc.stdout
+        return None
+
+    def compile_fragments(self, codes):
+        """
+        Compile many C# code fragments with one build per batch.
+
+        Each fragment is written to its own file in the batch project,
+        inside a namespace of its own, so fragments can declare the same
+        class names without clashing. The build's errors are mapped back
+        to fragments by file name. A fragment with errors is compiled
+        again on its own, since the namespace can change how its names
+        resolve, and only that result is returned.
+
+        Returns:
+            List with the error message of each fragment, None for the
+            fragments that compile.
+        """
+        errors = []
+        batch_size = Config.FRAGMENT_BATCH_SIZE
+        for start in range(0, len(codes), batch_size):
+            batch = codes[start:start + batch_size]
+            failed = self._build_batch(batch)
+            errors.extend(
+                self.compile_fragment(code) if i in failed else None
+                for i, code in enumerate(batch)
+            )
+        return errors
+
+    def _build_batch(self, codes):
+        """
+        Build a batch of fragments in the batch project.
+
+        Returns:
+            Indices of the fragments the build reported errors for (all
+            of them if the errors can't be attributed to fragments).
+        """
+        # Replace the previous batch's files.
+        for name in os.listdir(self._batch_path):
+            if name.endswith('.cs'):
+                os.remove(f"{self._batch_path}/{name}")
+        for i, code in enumerate(codes):
+            with open(f"{self._batch_path}/Fragment{i}.cs", "w") as f:
+                f.write(f"{self.IMPORTS}namespace Fragment{i}\n{{\n{code}\n}}\n")
+        proc = self._build(self._batch_path)
+        if not proc.returncode:
+            return set()
+        failed = {
+            int(match.group(1))
+            for match in self.FRAGMENT_ERROR_PATTERN.finditer(proc.stdout)
+        }
+        return failed or set(range(len(codes)))
+
+    def _build(self, path):
+        """Build the project in the given directory."""
+        return subprocess.run(
             [
                 'dotnet',
                 'build',
@@ -120,18 +220,18 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
                 '-v:q',
                 '-clp:ErrorsOnly;NoSummary;DisableConsoleColor'
             ],
-            cwd=self._ramdisk_path,
+            cwd=path,
             capture_output=True,
             text=True,
-            env={
-                **os.environ,
-                "DOTNET_SYSTEM_CONSOLE_ALLOW_ANSI_COLOR_REDIRECTION": "0",
-                "DOTNET_CLI_TELEMETRY_OPTOUT": "1",
-                "DOTNET_NOLOGO": "1",
-                "TERM": "dumb",
-            }
+            env=self._env()
         )
-        # Return the errors if there are any.
-        if proc.returncode:
-            return proc.stdout
-        return None
+
+    def _env(self):
+        """Environment for dotnet commands: no colors, telemetry or banners."""
+        return {
+            **os.environ,
+            "DOTNET_SYSTEM_CONSOLE_ALLOW_ANSI_COLOR_REDIRECTION": "0",
+            "DOTNET_CLI_TELEMETRY_OPTOUT": "1",
+            "DOTNET_NOLOGO": "1",
+            "TERM": "dumb",
+        }
@@ -1,6 +1,10 @@
 """Python code validation using mypy."""
+import os
 import subprocess
+from functools import cached_property
+from importlib import metadata
 
+from cache import content_hash
 from compilers.compiler import Compiler
 from config import Config
 
@@ -40,6 +44,24 @@ class PythonCompiler(Compiler):
         )
         # Define the path.
         self._path = f"{self._ramdisk_path}/test.py"  
+        # Directory of the modules that compile_fragments checks together.
+        self._batch_path = f"{self._ramdisk_path}/fragments"
+
+    @cached_property
+    def version(self):
+        """The mypy and stubs versions, plus a hash of the mypy settings."""
+        mypy = subprocess.run(
+            ['mypy', '--version'], capture_output=True, text=True
+        ).stdout.strip()
+        try:
+            stubs = metadata.version('quantconnect-stubs')
+        except metadata.PackageNotFoundError:
+            stubs = 'unknown'
+        with open(self._mypy_config_path, 'r', encoding='utf-8') as f:
+            settings = content_hash(
+                f.read(), *self.FRAGMENT_IMPORTS, *self.IGNORED_PATTERNS
+            )
+        return f'{mypy}; quantconnect-stubs {stubs}; settings {settings[:12]}'
 
     def compile_fragment(self, code):
         """
@@ -63,6 +85,66 @@ class PythonCompiler(Compiler):
             return self._filter_errors(result.stdout)
         return None
 
+    def compile_fragments(self, codes):
+        """
+        Type check many Python code fragments with one dmypy run per batch.
+
+        Each fragment is written as its own module, so the daemon loads
+        the stubs once for the whole batch. The errors are mapped back to
+        each fragment and reported as compile_fragment reports them.
+        If the batch fails with errors that aren't in a fragment's module
+        (e.g. in the stubs or the mypy config), its fragments are checked
+        again one at a time.
+
+        Returns:
+            List with the error message of each fragment, None for the
+            fragments that pass.
+        """
+        errors = []
+        batch_size = Config.FRAGMENT_BATCH_SIZE
+        for start in range(0, len(codes), batch_size):
+            errors.extend(self._check_batch(codes[start:start + batch_size]))
+        return errors
+
+    def _check_batch(self, codes):
+        """Type check a batch of fragments, returning their error messages."""
+        # Replace the previous batch's modules.
+        os.makedirs(self._batch_path, exist_ok=True)
+        for name in os.listdir(self._batch_path):
+            os.remove(f"{self._batch_path}/{name}")
+        paths = []
+        for i, code in enumerate(codes):
+            paths.append(f"{self._batch_path}/fragment_{i}.py")
+            with open(paths[-1], "w") as f:
+                f.write('\n'.join(self.FRAGMENT_IMPORTS) + '\n' + code)
+        result = subprocess.run(
+            ['dmypy', 'check', *paths],
+            capture_output=True,
+            text=True
+        )
+        if not result.returncode:
+            return [None] * len(codes)
+        # Group the output lines by module, e.g.
+        # "/mnt/ramdisk/fragments/fragment_3.py:12: error: ...", and name
+        # the file compile_fragment checks instead.
+        lines_by_path = {path: [] for path in paths}
+        unmapped = []
+        for line in result.stdout.split('\n'):
+            path, _, rest = line.partition(':')
+            line_number, _, _ = rest.partition(':')
+            if path in lines_by_path and line_number.isdigit():
+                lines_by_path[path].append(f"{self._path}:{rest}")
+            elif line:
+                unmapped.append(line)
+        # An error outside the fragments' modules (or a failure without any
+        # errors, like a daemon crash) can't be pinned on one fragment.
+        if (self._filter_errors('\n'.join(unmapped))
+                or not any(lines_by_path.values())):
+            return [self.compile_fragment(code) for code in codes]
+        return [
+            self._filter_errors('\n'.join(lines_by_path[path])) for path in paths
+        ]
+
     def _filter_errors(self, output):
         """Filter out known false positive errors from mypy output."""
         # Remove lines containing ignored patterns.
@@ -9,24 +9,46 @@ class Config:
     RAMDISK = "/mnt/ramdisk"
     ROOT_DIR = "."
     MYPY_CONFIG = "/app/Documentation/examples-check/mypy.ini"
-    TEMP_PHP_FILE = "temp_script.php"
+    # Extracted snippets and compile results, reused by the next run (see
+    # cache.py). Mount a volume here to keep them between containers.
+    CACHE_DIR = os.environ.get(
+        "DOCS_REGRESSION_CACHE_DIR",
+        os.path.expanduser("~/.cache/examples-check")
+    )
 
     # Test settings
     WORKERS = 10  # Limited by number of backtest nodes in the organization.
+    EXTRACT_WORKERS = os.cpu_count() or 1  # Processes that parse/render pages.
+    EXTRACT_CHUNK_SIZE = 16  # Pages per task sent to an extraction process.
+    FRAGMENT_BATCH_SIZE = 500  # Code fragments compiled per build.
+    # Workers upload and compile their next code block while their current
+    # backtest runs.
+    PIPELINE_COMPILES = True
 
     # API settings
-    BASE_API = "https://www.quantconnect.com/api/v2"
+    # Point at a stand-in server (see mock_api_server.py) to run offline.
+    BASE_API = os.environ.get(
+        "DOCS_REGRESSION_API_URL", "https://www.quantconnect.com/api/v2"
+    )
     USER_ID = os.environ["DOCS_REGRESSION_TEST_USER_ID"]
     USER_TOKEN = os.environ["DOCS_REGRESSION_TEST_USER_TOKEN"]
 
-    # Rate limiting
+    # Rate limiting, shared by all the workers (see rate_limiter.py)
     CALLS = 100
     RATE_LIMIT = 60  # seconds
+    RATE_BURST = 10  # calls sent back to back, out of CALLS
+
+    # Status polling (see poller.py): first delay, max delay and timeout
+    # between reads of a job's state, in seconds.
+    COMPILE_POLL = (1, 5, 120)
+    BACKTEST_POLL = (2, 30, 3600)
+    LOG_POLL = (1, 10, 60)
+    STATISTICS_POLL = (2, 10, 30)
 
     # Thresholds
     MIN_LINES_FOR_BACKTEST = 50
     MAX_LOG_LINES = 500
-    MAX_LOG_ATTEMPTS = 12
+    LOG_PAGE_SIZE = 250  # Most log lines the API returns per request.
     MAX_RETRY_ATTEMPTS = 5
 
     # Directories to skip
@@ -1,11 +1,34 @@
 """File processing for HTML/PHP documentation files."""
+import hashlib
+import json
 import os
+import re
 import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
 from bs4 import BeautifulSoup
 
+from cache import ExamplesCache
 from config import Config
 from utils import Language, CodeBlock
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from doc_index import load_doc_index  # noqa: E402
+
+
+# Prepended to every rendered PHP page (auto_prepend_file) to print the
+# files the page included after its output.
+INCLUDED_FILES_MARKER = '\n<!-- included files: '
+INCLUDE_TRACKER = (
+    '<?php register_shutdown_function(function () {\n'
+    f'    echo {json.dumps(INCLUDED_FILES_MARKER)} . json_encode(get_included_files());\n'
+    '});\n'
+)
+# Resources read with a literal path, e.g. file_get_contents(DOCS_RESOURCES."/x.html").
+RESOURCE_PATH_PATTERN = re.compile(r'DOCS_RESOURCES\s*\.\s*(["\'])([^"\'$]+)\1')
+
 
 class FileProcessor:
     """Handles file discovery and code extraction from documentation."""
@@ -29,6 +52,10 @@ class FileProcessor:
         validates them (syntax, QCAlgorithm class, date ranges),
         and returns a list of CodeBlocks objects ready for backtesting.
 
+        Pages and fragments that haven't changed since the previous run
+        are served from the cache (see cache.py) instead of being parsed,
+        rendered and compiled again.
+
         Args:
             directory: Root directory to search for documentation files
 
@@ -36,157 +63,339 @@ class FileProcessor:
             List of CodeBlocks objects containing validated, testable 
             algorithm code.
         """
-        self._remove_temp_php_file()
         print('Gathering code blocks...')
+        self._cache = ExamplesCache()
+        self._write_include_tracker()
+        # Skip directories in the skip list.
+        file_paths = [
+            file_path for file_path in self._doc_files(directory)
+            if not any(p in file_path for p in Config.SKIP_DIRECTORIES)
+        ]
+        snippets_by_path = self._page_snippets(file_paths)
         algorithms = []
-        for root, _, filenames in sorted(os.walk(directory)):
-            file_paths = sorted([
-                os.path.join(root, f)
-                for f in filenames
-                if f.lower().endswith(('.html', '.php'))
-            ])
-            
-            for file_path in file_paths:
-                # Skip directories in the skip list.
-                if any(p in file_path for p in Config.SKIP_DIRECTORIES):
+        # Fragments to compile, by language, compiled in batches below.
+        fragments = {language: [] for language in self._compilers}
+        cached_fragments = 0
+        for file_path in file_paths:
+            #print(f'Processing file {file_path}')
+
+            indicator_ref_page = '/01 Supported Indicators' in file_path
+
+            # Drop the extension and the file number.
+            h3_title = file_path.split('/')[-1].split('.')[0][3:].lower()
+            should_backtest_h3 = h3_title in Config.BACKTEST_H3_TITLES
+
+            for div_idx, pre_idx, language, code, testable_div in snippets_by_path[file_path]:
+                language = Language(language)
+                compiler = self._compilers[language]
+                # If this code block doesn't subclass 
+                # QCAlgorithm, just continue.
+                if not compiler.is_algorithm_class(code):
                     continue
-                #print(f'Processing file {file_path}')
-
-                indicator_ref_page = '/01 Supported Indicators' in file_path
-
-                # Drop the extension and the file number.
-                h3_title = file_path.split('/')[-1].split('.')[0][3:].lower()
-                should_backtest_h3 = h3_title in Config.BACKTEST_H3_TITLES
-
-                # Convert PHP to HTML if needed
-                original_file_path = file_path
-                if file_path.endswith(".php"):
-                    self._run_php_script(file_path)
-                    file_path = Config.TEMP_PHP_FILE
-
-                # Read the HTML file.
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    soup = BeautifulSoup(file, 'html.parser')
-
-                    # Get all div elements with the `section-example-container`
-                    # class.
-                    divs = soup.find_all(
-                        lambda tag: (
-                            tag.name == 'div' and
-                            'class' in tag.attrs and
-                            'section-example-container' in tag['class']
+                # Create a CodeBlock object for this snippet
+                # to make logging and backtesting easier.
+                code_block = CodeBlock(
+                    file_path, div_idx, pre_idx, language, code
+                )
+                # If this code block doesn't have `testable`...
+                if not testable_div:
+                    # If the algorithm has >=50 lines or we're in a
+                    # "should_backtest_h3", we should add `testable`
+                    # to it.
+                    if (len(code.split('\n')) >= Config.MIN_LINES_FOR_BACKTEST or
+                        should_backtest_h3):
+                        print(
+                            f'{code_block}\n',
+                            '-> Missing `testable` class.\n'
                         )
+
+                    # If this code block is not in Examples h3...
+                    elif not should_backtest_h3:
+                        # Test if we can build it without error.
+                        key = self._cache.fragment_key(compiler, language, code)
+                        if self._cache.has_passed(key):
+                            cached_fragments += 1
+                        else:
+                            fragments[language].append((code_block, key))
+
+                    continue
+                # Check if the algorithm has a date range.
+                if (not indicator_ref_page and 
+                    not compiler.has_date_range(code)):
+                    print(
+                        f'{code_block}\n',
+                        f'-> Missing date range.\n',
                     )
-                    # Iterate through each div.
-                    for div_idx, div in enumerate(divs):
-                        classes = div.attrs.get('class', [])
-                        # Skip <div> blocks with the skip-test class.
-                        if 'skip-test' in classes:
-                            continue
-                        # Check for the `testable` class.
-                        testable_div = 'testable' in classes
-                        # Iterate through each <pre> snippet.
-                        for pre_idx, pre in enumerate(div.find_all('pre')):
-                            code = pre.get_text()
-                            classes = pre.get('class', [])
-
-                            # Determine the language.
-                            if 'csharp' in classes:
-                                language = Language.CSHARP
-                            elif 'python' in classes:
-                                language = Language.PYTHON
-                            else:
-                                continue
-
-                            compiler = self._compilers[language]
-                            # If this code block doesn't subclass 
-                            # QCAlgorithm, just continue.
-                            if not compiler.is_algorithm_class(code):
-                                continue
-                            # Create a CodeBlock object for this snippet
-                            # to make logging and backtesting easier.
-                            code_block = CodeBlock(
-                                original_file_path, div_idx, pre_idx, language, 
-                                code
-                            )
-                            # If this code block doesn't have `testable`...
-                            if not testable_div:
-                                # If the algorithm has >=50 lines or we're in a
-                                # "should_backtest_h3", we should add `testable`
-                                # to it.
-                                if (len(code.split('\n')) >= Config.MIN_LINES_FOR_BACKTEST or
-                                    should_backtest_h3):
-                                    print(
-                                        f'{code_block}\n',
-                                        '-> Missing `testable` class.\n'
-                                    )
-
-                                # If this code block is not in Examples h3...
-                                elif not should_backtest_h3:
-                                    # Test if we can build it without error.
-                                    error = compiler.compile_fragment(code)
-                                    if error:
-                                        print(
-                                            f'{code_block}\n',
-                                            f'-> Compile failed. Errors:\n{error}\n'
-                                        )
-
-                                continue
-                            # Check if the algorithm has a date range.
-                            if (not indicator_ref_page and 
-                                not compiler.has_date_range(code)):
-                                print(
-                                    f'{code_block}\n',
-                                    f'-> Missing date range.\n',
-                                )
-                                continue
-
-                            #print(
-                            #    f'{code_block}\n', 
-                            #    '-> Selected for backtesting.\n'
-                            #)
-                            algorithms.append(code_block)
-        self._remove_temp_php_file()
+                    continue
+
+                #print(
+                #    f'{code_block}\n', 
+                #    '-> Selected for backtesting.\n'
+                #)
+                algorithms.append(code_block)
+        print(
+            f'Reused {cached_fragments} compiled fragments from the cache. '
+            f'Compiling {sum(map(len, fragments.values()))} fragments...'
+        )
+        for language, pending in fragments.items():
+            self._compile_fragments(self._compilers[language], pending)
+        self._cache.close()
+        self._index.save()
         return algorithms
-    
-    def _run_php_script(self, php_path):
-        """Convert PHP to HTML by executing it."""
-        # Read the PHP script
-        with open(php_path, 'r', encoding="utf-8") as f:
-            content = f.read()
-
-        # Replace DOCS_RESOURCES with actual path
-        content = (
-            content
-            .replace('DOCS_RESOURCES."', '"./Resources')
-            .replace("DOCS_RESOURCES.'", "'./Resources")
+
+    def _compile_fragments(self, compiler, fragments):
+        """
+        Compile code fragments, reporting the ones that fail.
+
+        Args:
+            compiler: Compiler of the fragments' language
+            fragments: List of (CodeBlock, cache key) tuples
+        """
+        # Snippets repeated across pages are compiled once.
+        codes = {key: code_block.code for code_block, key in fragments}
+        errors = dict(zip(codes, compiler.compile_fragments(list(codes.values()))))
+        for code_block, key in fragments:
+            error = errors[key]
+            if error:
+                print(
+                    f'{code_block}\n',
+                    f'-> Compile failed. Errors:\n{error}\n'
+                )
+            else:
+                self._cache.add_passed(key)
+
+    def _page_snippets(self, file_paths):
+        """
+        Get the code snippets of each page, from the cache when possible.
+
+        The pages that changed are parsed (and PHP pages rendered) on a
+        process pool, since each page is independent.
+
+        Args:
+            file_paths: Paths of the HTML/PHP files
+
+        Returns:
+            Dictionary mapping each path to its snippets (see
+            extract_snippets).
+        """
+        snippets_by_path = {}
+        page_hashes = {}
+        for file_path in file_paths:
+            page_hashes[file_path] = self._file_hash(file_path)
+            snippets = self._cache.get_snippets(
+                file_path, page_hashes[file_path], self._file_hash
+            )
+            if snippets is not None:
+                snippets_by_path[file_path] = snippets
+        changed = [p for p in file_paths if p not in snippets_by_path]
+        print(
+            f'Reused {len(file_paths) - len(changed)}/{len(file_paths)} pages '
+            f'from the cache. Extracting {len(changed)} pages...'
         )
+        if not changed:
+            return snippets_by_path
+
+        workers = min(Config.EXTRACT_WORKERS, len(changed))
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(
+                extract_snippets, changed, repeat(self._include_tracker),
+                chunksize=Config.EXTRACT_CHUNK_SIZE
+            )
+            for file_path, (snippets, dependencies) in zip(changed, results):
+                snippets_by_path[file_path] = snippets
+                # Pages whose includes couldn't be tracked are extracted
+                # every run.
+                if dependencies is not None:
+                    self._cache.put_snippets(
+                        file_path, page_hashes[file_path],
+                        {path: self._file_hash(path) for path in dependencies},
+                        snippets
+                    )
+        return snippets_by_path
+
+    def _doc_files(self, directory):
+        """
+        List the HTML/PHP files under the directory, in os.walk order.
+
+        Served from the repository's shared doc index (see doc_index.py),
+        so a warm tree isn't walked again.
+
+        Args:
+            directory: Root directory to search for documentation files
+
+        Returns:
+            List of file paths, sorted by directory, then file name.
+        """
+        self._index = load_doc_index(Path(directory))
+        self._docs = {
+            os.path.normpath(doc.path): doc for doc in self._index.files
+        }
+        docs = self._index.files_with_suffix('.html', '.php')
+        return [doc.path for doc in docs]
+
+    def _file_hash(self, path):
+        """
+        Get the content hash of a file, None if it doesn't exist.
+
+        Files in the doc index are hashed once and the hash is kept in
+        the index until the file changes.
+        """
+        doc = self._docs.get(os.path.normpath(path))
+        if doc is not None:
+            return self._index.content_hash(doc)
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def _write_include_tracker(self):
+        """Write the PHP file that reports the files each page included."""
+        self._include_tracker = os.path.join(Config.CACHE_DIR, 'include_tracker.php')
+        with open(self._include_tracker, 'w', encoding='utf-8') as f:
+            f.write(INCLUDE_TRACKER)
 
-        # Write temporary PHP file
-        with open(Config.TEMP_PHP_FILE, 'w', encoding='utf-8') as f:
-            f.write(content)
 
-        # Execute PHP script
-        result = subprocess.run(
-            ['php', '-d', 'short_open_tag=1', Config.TEMP_PHP_FILE],
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
+def extract_snippets(file_path, include_tracker):
+    """
+    Extract the code snippets of a page.
+
+    Module-level, so it can run on a process pool.
+
+    Args:
+        file_path: Path of the HTML/PHP file
+        include_tracker: Path of the PHP file that reports a page's
+            includes (see INCLUDE_TRACKER)
+
+    Returns:
+        Tuple of the snippets and the paths of the files the page
+        depends on (None if they are unknown). Each snippet is a
+        [div_idx, pre_idx, language value, code, testable_div] list.
+    """
+    # Convert PHP to HTML if needed
+    if file_path.endswith(".php"):
+        html, dependencies = _render_php(file_path, include_tracker)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            html, dependencies = file.read(), []
+    soup = BeautifulSoup(html, 'html.parser')
+
+    snippets = []
+    # Get all div elements with the `section-example-container`
+    # class.
+    divs = soup.find_all(
+        lambda tag: (
+            tag.name == 'div' and
+            'class' in tag.attrs and
+            'section-example-container' in tag['class']
         )
+    )
+    # Iterate through each div.
+    for div_idx, div in enumerate(divs):
+        classes = div.attrs.get('class', [])
+        # Skip <div> blocks with the skip-test class.
+        if 'skip-test' in classes:
+            continue
+        # Check for the `testable` class.
+        testable_div = 'testable' in classes
+        # Iterate through each <pre> snippet.
+        for pre_idx, pre in enumerate(div.find_all('pre')):
+            code = pre.get_text()
+            classes = pre.get('class', [])
+
+            # Determine the language.
+            if 'csharp' in classes:
+                language = Language.CSHARP
+            elif 'python' in classes:
+                language = Language.PYTHON
+            else:
+                continue
+            snippets.append(
+                [div_idx, pre_idx, language.value, code, testable_div]
+            )
+    return snippets, dependencies
+
+
+def _render_php(php_path, include_tracker):
+    """
+    Convert PHP to HTML by executing it.
 
-        # Update output to mark testable containers
-        output = result.stdout.strip().replace(
-            '<div class="section-example-container to-be-tested">',
-            '<div class="section-example-container testable">'
+    The page is piped to PHP's stdin and the HTML read back from stdout,
+    so any number of pages can render at the same time.
+
+    Returns:
+        Tuple of the HTML and the paths of the files the page read while
+        rendering (None if PHP didn't report them).
+    """
+    # Read the PHP script
+    with open(php_path, 'r', encoding="utf-8") as f:
+        source = f.read()
+
+    # Replace DOCS_RESOURCES with actual path
+    content = (
+        source
+        .replace('DOCS_RESOURCES."', '"./Resources')
+        .replace("DOCS_RESOURCES.'", "'./Resources")
+    )
+
+    # Execute PHP script
+    result = subprocess.run(
+        [
+            'php', '-d', 'short_open_tag=1',
+            '-d', f'auto_prepend_file={include_tracker}'
+        ],
+        input=content,
+        capture_output=True,
+        text=True,
+        encoding='utf-8'
+    )
+
+    # Split off the list of included files.
+    output, marker, included = result.stdout.rpartition(INCLUDED_FILES_MARKER)
+    dependencies = None
+    if marker:
+        dependencies = _php_dependencies(
+            source, json.loads(included), include_tracker
         )
+    else:
+        output = included
+
+    # Update output to mark testable containers
+    html = output.strip().replace(
+        '<div class="section-example-container to-be-tested">',
+        '<div class="section-example-container testable">'
+    )
+    return html, dependencies
+
+
+def _php_dependencies(source, included_files, include_tracker):
+    """
+    Get the files a rendered PHP page depends on.
 
-        # Write processed output
-        with open(Config.TEMP_PHP_FILE, 'w', encoding='utf-8') as f:
-            f.write(output)
+    Args:
+        source: The page's PHP source
+        included_files: The files PHP reported as included
+        include_tracker: Path of the include tracker, which isn't one
 
-    def _remove_temp_php_file(self):
-        """Remove the temporary PHP file, if it exists."""
+    Returns:
+        Sorted paths, relative to the working directory, of the included
+        files and of the resources they (or the page) read with a literal
+        DOCS_RESOURCES path, like file_get_contents.
+    """
+    tracker = os.path.realpath(include_tracker)
+    # The page itself is read from stdin, so it isn't a file.
+    dependencies = {
+        os.path.relpath(path) for path in included_files
+        if os.path.isfile(path) and os.path.realpath(path) != tracker
+    }
+    sources = [source]
+    for path in dependencies:
         try:
-            os.remove(Config.TEMP_PHP_FILE)
-        except FileNotFoundError:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                sources.append(f.read())
+        except OSError:
             pass
+    for text in sources:
+        for match in RESOURCE_PATH_PATTERN.finditer(text):
+            dependencies.add(os.path.normpath('./Resources' + match.group(2)))
+    return sorted(dependencies)
@@ -1,4 +1,16 @@
+import argparse
+
 from manager import RegressionTestManager
 
 if __name__ == "__main__":
-    RegressionTestManager().run()
+    parser = argparse.ArgumentParser(
+        description="Compile and backtest the code blocks in the docs."
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Backtest every algorithm, even the ones that passed (or "
+             "failed the log scan) on the current LEAN version in a "
+             "previous run."
+    )
+    args = parser.parse_args()
+    RegressionTestManager().run(force=args.force)
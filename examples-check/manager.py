@@ -1,25 +1,38 @@
 """Main orchestration for regression testing."""
 import os
+import queue
 import time
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from config import Config
 from utils import Language, log_with_time
 from api_client import APIClient
+from cache import ExamplesCache
 from file_processor import FileProcessor
-from backtest_runner import BacktestRunner
+from backtest_runner import BacktestError, BacktestResult, BacktestRunner
 from compilers import PythonCompiler, CSharpCompiler
 
 
-# Module-level worker runner (one per worker process)
-_worker_runner = None
+def _run_worker(
+        worker_id, tasks, results, api_client, compiler_by_language,
+        timestamp):
+    """
+    Backtest code blocks from the task queue until it's empty (runs in
+    each worker process).
 
-def _init_worker(api_client, compiler_by_language, timestamp):
-    """Initialize each worker with its own projects and runner."""
-    global _worker_runner
-    worker_id = mp.current_process()._identity[0]
-    _worker_runner = BacktestRunner(
+    Args:
+        worker_id: Number of the worker, for its project names
+        tasks: Queue of (index, CodeBlock) tuples, ended by a None per
+            worker
+        results: Queue that gets an (index, seconds, BacktestResult)
+            tuple per code block
+        api_client: APIClient to call the API with
+        compiler_by_language: Dictionary mapping Language to compiler
+        timestamp: Timestamp of the run, for the project names
+    """
+    runner = BacktestRunner(
         api_client,
         compiler_by_language,
         # Create projects for this worker
@@ -32,11 +45,71 @@ def _init_worker(api_client, compiler_by_language, timestamp):
             )
         }
     )
+    if Config.PIPELINE_COMPILES:
+        _run_pipeline(runner, tasks, results)
+        return
+    for index, code_block in iter(tasks.get, None):
+        start = time.time()
+        result = runner.run_backtest(code_block)
+        _report(code_block, result)
+        results.put((index, time.time() - start, result))
 
-def _backtest_code_block(code_block):
-    """Process a single code block (called by each worker)."""
-    global _worker_runner
-    result = _worker_runner.run_backtest(code_block)
+
+def _run_pipeline(runner, tasks, results):
+    """
+    Backtest code blocks from the task queue, compiling each one while
+    the previous one's backtest runs.
+
+    The worker still runs one backtest at a time: it starts a backtest
+    once the previous one finished, so it doesn't take more than its
+    backtest node.
+    """
+    with ThreadPoolExecutor(1) as waiter:
+        pending = None
+        for index, code_block in iter(tasks.get, None):
+            start = time.time()
+            compile_error = None
+            try:
+                compiled = runner.compile(code_block)
+            except BacktestError as e:
+                compile_error = e
+            compile_seconds = time.time() - start
+            if pending:
+                results.put(pending.result())
+                pending = None
+            try:
+                if compile_error:
+                    raise compile_error
+                backtest_id = runner.start_backtest(code_block, compiled)
+            except BacktestError as e:
+                result = BacktestResult(False, str(e))
+                _report(code_block, result)
+                results.put((index, time.time() - start, result))
+                continue
+            pending = waiter.submit(
+                _wait_for_backtest, runner, index, code_block, compiled[0],
+                backtest_id, time.time() - compile_seconds
+            )
+        if pending:
+            results.put(pending.result())
+
+
+def _wait_for_backtest(runner, index, code_block, project_id, backtest_id, start):
+    """
+    Wait for a started backtest (runs on the pipeline's waiter thread).
+
+    Returns:
+        Tuple of the index, the seconds the code block took (compiling
+        and backtesting, not waiting for the previous backtest) and the
+        BacktestResult.
+    """
+    result = runner.wait_for_backtest(project_id, backtest_id)
+    _report(code_block, result)
+    return index, time.time() - start, result
+
+
+def _report(code_block, result):
+    """Keep the statistics of a passed backtest, or print why it failed."""
     if result.success:
         code_block.statistics = result.statistics
     else:
@@ -49,8 +122,15 @@ def _backtest_code_block(code_block):
 class RegressionTestManager:
     """Orchestrates the entire regression testing process."""
 
-    def run(self):
-        """Run the complete regression test suite."""
+    def run(self, force=False):
+        """
+        Run the complete regression test suite.
+
+        Args:
+            force: Backtest every algorithm, even the ones whose code
+                already passed (or failed the log scan) on the current
+                LEAN version
+        """
         start_time = time.time()
         log_with_time(start_time, "Start regression testing.")
 
@@ -70,14 +150,193 @@ class RegressionTestManager:
         algorithms = FileProcessor(compiler_by_language).process_code_blocks(Config.ROOT_DIR)
         log_with_time(start_time, f"Found {len(algorithms)} algorithms to test")
 
-        # Set up with multiprocessing.
-        workers = Config.WORKERS
-        log_with_time(start_time, f"Start testing with {workers} workers")
-        # Process code blocks in parallel with n workers.
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        worker_args = (api_client, compiler_by_language, timestamp)
-        with mp.Pool(workers, _init_worker, worker_args) as pool:
-            pool.map(_backtest_code_block, algorithms)
+        cache = ExamplesCache()
+        try:
+            result_keys = self._result_keys(
+                algorithms, cache, api_client, compiler_by_language,
+                start_time
+            )
+            if not force:
+                algorithms = self._reuse_results(
+                    algorithms, cache, result_keys, start_time
+                )
+
+            # Set up with multiprocessing. Each worker creates its own
+            # projects, so don't start more than there are algorithms.
+            workers = min(Config.WORKERS, len(algorithms))
+            if not workers:
+                log_with_time(start_time, "Nothing to backtest")
+                return
+            log_with_time(start_time, f"Start testing with {workers} workers")
+            order = self._schedule(algorithms, cache, workers, start_time)
+            # Process code blocks in parallel with n workers.
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            for index, seconds, result in self._backtest(
+                    algorithms, order, workers, api_client,
+                    compiler_by_language, timestamp, start_time):
+                code_block = algorithms[index]
+                cache.add_runtime(code_block, seconds)
+                key = result_keys.get(code_block)
+                # Other failures (API errors, timeouts) aren't stored, so
+                # they are backtested and reported again next run.
+                if key and (result.success or result.failed_queries):
+                    cache.put_result(
+                        key, result.statistics, result.failed_queries,
+                        result.order_count
+                    )
+        finally:
+            cache.close()
 
         log_with_time(start_time, "Finished all testing")
         log_with_time(start_time, "Done!")
+
+    def _backtest(
+            self, algorithms, order, workers, api_client,
+            compiler_by_language, timestamp, start_time):
+        """
+        Backtest the code blocks on worker processes.
+
+        The code blocks wait in one queue, in dispatch order, and each
+        worker takes the next one when it's ready for it, so no worker
+        sits idle while others still have work.
+
+        Yields:
+            Tuple of the index, the seconds and the BacktestResult of each
+            code block, as they finish.
+        """
+        tasks, results = mp.Queue(), mp.Queue()
+        for i in order:
+            tasks.put((i, algorithms[i]))
+        for _ in range(workers):
+            tasks.put(None)
+        # Each worker backtests in its own projects, so it keeps its own
+        # compiles (see BacktestRunner).
+        processes = [
+            mp.Process(
+                target=_run_worker,
+                args=(
+                    worker_id, tasks, results, api_client,
+                    compiler_by_language, timestamp
+                )
+            )
+            for worker_id in range(1, workers + 1)
+        ]
+        for process in processes:
+            process.start()
+        remaining = len(order)
+        while remaining:
+            try:
+                yield results.get(timeout=10)
+            except queue.Empty:
+                # Stop waiting if every worker died.
+                if not any(p.is_alive() for p in processes):
+                    log_with_time(
+                        start_time,
+                        f"All workers stopped with {remaining} "
+                        "algorithms left"
+                    )
+                    break
+                continue
+            remaining -= 1
+        for process in processes:
+            process.join()
+
+    def _result_keys(
+            self, algorithms, cache, api_client, compiler_by_language,
+            start_time):
+        """
+        Get the result store keys of the code blocks.
+
+        Returns:
+            Dictionary mapping each CodeBlock to its key (see
+            ExamplesCache.result_key). Empty if the LEAN version is unknown,
+            since results are only reused on the same version.
+        """
+        lean_version = api_client.read_lean_version()
+        if lean_version is None:
+            log_with_time(
+                start_time,
+                "Couldn't read the LEAN version. Not reusing any results."
+            )
+            return {}
+        log_with_time(start_time, f"LEAN version {lean_version}")
+        return {
+            code_block: cache.result_key(
+                compiler_by_language[code_block.language], code_block,
+                lean_version
+            )
+            for code_block in algorithms
+        }
+
+    def _reuse_results(self, algorithms, cache, result_keys, start_time):
+        """
+        Fill in the results of the code blocks backtested before, and
+        report the ones that failed the log scan again.
+
+        Args:
+            algorithms: List of CodeBlocks to backtest
+            cache: ExamplesCache with the results of previous runs
+            result_keys: Dictionary mapping each CodeBlock to its key
+            start_time: Start time of the run, for logging
+
+        Returns:
+            List of the CodeBlocks that still need a backtest.
+        """
+        pending = []
+        failed = 0
+        for code_block in algorithms:
+            key = result_keys.get(code_block)
+            stored = cache.get_result(key) if key else None
+            if stored is None:
+                pending.append(code_block)
+                continue
+            failed_queries = stored['failed_queries']
+            if failed_queries:
+                failed += 1
+                result = BacktestResult(
+                    False, f'Failed queries: {failed_queries}',
+                    failed_queries=failed_queries
+                )
+            else:
+                result = BacktestResult(
+                    True, "", stored['statistics'], failed_queries
+                )
+            _report(code_block, result)
+        log_with_time(
+            start_time,
+            f"Reused {len(algorithms) - len(pending)} backtest results "
+            f"({failed} failed). {len(pending)} algorithms to backtest"
+        )
+        return pending
+
+    def _schedule(self, algorithms, cache, workers, start_time):
+        """
+        Order the code blocks longest expected backtest first.
+
+        Dispatching the long backtests first leaves the short ones to fill
+        in at the end, so the workers finish at about the same time.
+
+        Args:
+            algorithms: List of CodeBlocks to backtest
+            cache: ExamplesCache with the runtimes of previous runs
+            workers: Number of worker processes
+            start_time: Start time of the run, for logging
+
+        Returns:
+            List of indices into algorithms, in dispatch order.
+        """
+        runtimes = [cache.get_runtime(code_block) for code_block in algorithms]
+        known = [seconds for seconds in runtimes if seconds is not None]
+        # Code blocks without history could take any time, so they start
+        # first rather than risk a long one starting last.
+        order = sorted(
+            range(len(algorithms)),
+            key=lambda i: (runtimes[i] is not None, -(runtimes[i] or 0))
+        )
+        log_with_time(
+            start_time,
+            f"{len(known)} algorithms have runtime history "
+            f"({sum(known) / 60:.0f} min of backtests, "
+            f"~{sum(known) / 60 / workers:.0f} min with {workers} workers)"
+        )
+        return order
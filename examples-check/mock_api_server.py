@@ -0,0 +1,279 @@
+"""Local stand-in for the QuantConnect API, to run the harness offline.
+
+Serves canned responses for the endpoints that examples-check,
+run_model_variants.py and project-templates/run_project_match_check.py
+use, with configurable latency and failure rates. Compiles and backtests
+take simulated time, and backtests report progress, so the harness's
+scheduling, polling and rate limiting can be measured without a live
+organization.
+
+Usage:
+    python examples-check/mock_api_server.py --port 8000 --latency 0.2
+    DOCS_REGRESSION_API_URL=http://localhost:8000/api/v2 python examples-check/main.py
+
+GET /stats returns the number of requests per endpoint and the jobs
+started, to measure the harness's throughput.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STATISTICS = {
+    "Total Orders": "12",
+    "Average Win": "0.51%",
+    "Average Loss": "-0.32%",
+    "Compounding Annual Return": "8.214%",
+    "Drawdown": "4.100%",
+    "Net Profit": "2.015%",
+    "Sharpe Ratio": "0.812",
+    "Win Rate": "58%",
+}
+# Lines in every backtest's log; the queries for errors match none.
+LOG_LINES = 20
+
+
+class MockQuantConnect:
+    """State of the stand-in API: projects, compiles and backtests."""
+
+    def __init__(self, compile_seconds, backtest_seconds, compile_error_rate):
+        """
+        Initialize the stand-in.
+
+        Args:
+            compile_seconds: Time a compile takes
+            backtest_seconds: Mean time a backtest takes (each backtest
+                takes 50-150% of it)
+            compile_error_rate: Fraction of compiles that fail
+        """
+        self._compile_seconds = compile_seconds
+        self._backtest_seconds = backtest_seconds
+        self._compile_error_rate = compile_error_rate
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._files = {}       # (project Id, file name) -> content
+        self._compiles = {}    # compile Id -> (start time, fails)
+        self._backtests = {}   # backtest Id -> (start time, duration, name)
+        self.requests = Counter()
+        self.jobs = Counter()
+
+    def handle(self, endpoint, payload):
+        """Get the response to a request, None for unknown endpoints."""
+        handler = getattr(self, '_' + endpoint.replace('/', '_'), None)
+        if handler is None:
+            return None
+        with self._lock:
+            self.requests[endpoint] += 1
+            return handler(payload)
+
+    def _ok(self, **fields):
+        return {'success': True, 'errors': [], **fields}
+
+    def _error(self, message):
+        return {'success': False, 'errors': [message]}
+
+    def _authenticate(self, payload):
+        return self._ok()
+
+    def _lean_versions_read(self, payload):
+        return self._ok(versions=[
+            {'id': 17000, 'name': 'master', 'public': True}
+        ])
+
+    def _projects_create(self, payload):
+        project_id = next(self._ids)
+        self.jobs['projects'] += 1
+        return self._ok(projects=[{
+            'projectId': project_id,
+            'name': payload.get('name', ''),
+            'language': payload.get('language', 'Py'),
+            'collaborators': [],
+        }])
+
+    def _projects_collaboration_create(self, payload):
+        return self._ok()
+
+    def _projects_collaboration_read(self, payload):
+        return self._ok(collaborators=[])
+
+    def _files_update(self, payload):
+        key = (payload.get('projectId'), payload.get('name'))
+        self._files[key] = payload.get('content', '')
+        return self._ok()
+
+    def _files_read(self, payload):
+        key = (payload.get('projectId'), payload.get('name'))
+        if key not in self._files:
+            return self._ok(files=[])
+        return self._ok(files=[{'name': key[1], 'content': self._files[key]}])
+
+    def _compile_create(self, payload):
+        compile_id = f'compile-{next(self._ids)}'
+        fails = random.random() < self._compile_error_rate
+        self._compiles[compile_id] = (time.monotonic(), fails)
+        self.jobs['compiles'] += 1
+        return self._ok(compileId=compile_id, state='InQueue', logs=[])
+
+    def _compile_read(self, payload):
+        compile_id = payload.get('compileId')
+        if compile_id not in self._compiles:
+            return self._error(f'Compile {compile_id} not found')
+        start, fails = self._compiles[compile_id]
+        if time.monotonic() - start < self._compile_seconds:
+            return self._ok(compileId=compile_id, state='InQueue', logs=[])
+        if fails:
+            logs = ['Build Error: File: main.py Line: 1 Column: 1 - simulated']
+            return self._ok(compileId=compile_id, state='BuildError', logs=logs)
+        return self._ok(compileId=compile_id, state='BuildSuccess', logs=[])
+
+    def _backtests_create(self, payload):
+        backtest_id = f'backtest-{next(self._ids)}'
+        duration = self._backtest_seconds * random.uniform(0.5, 1.5)
+        name = payload.get('backtestName', '')
+        self._backtests[backtest_id] = (time.monotonic(), duration, name)
+        self.jobs['backtests'] += 1
+        return self._ok(backtest={
+            'backtestId': backtest_id, 'name': name,
+            'completed': False, 'progress': 0
+        })
+
+    def _backtests_read(self, payload):
+        backtest_id = payload.get('backtestId')
+        if backtest_id not in self._backtests:
+            return self._error(f'Backtest {backtest_id} not found')
+        start, duration, name = self._backtests[backtest_id]
+        progress = min(1.0, (time.monotonic() - start) / duration)
+        completed = progress >= 1
+        return self._ok(backtest={
+            'backtestId': backtest_id,
+            'name': name,
+            'completed': completed,
+            'progress': progress,
+            'error': None,
+            'stacktrace': None,
+            'statistics': STATISTICS if completed else {},
+        })
+
+    def _backtests_read_log(self, payload):
+        # Only the unfiltered log has lines.
+        length = 0 if payload.get('query') else LOG_LINES
+        start = payload.get('start', 0)
+        end = min(payload.get('end', length), length)
+        logs = [f'log line {i}' for i in range(start, end)]
+        return self._ok(logs=logs, length=length)
+
+    def _backtests_orders_read(self, payload):
+        return self._ok(orders=[], length=0)
+
+    def _ai_tools_syntax_check(self, payload):
+        return self._ok(state='End', payload=[])
+
+
+def make_handler(api, latency, failure_rate):
+    """
+    Create the request handler class for the stand-in.
+
+    Args:
+        api: MockQuantConnect that answers the requests
+        latency: Mean seconds added to each response (each response
+            waits 50-150% of it)
+        failure_rate: Fraction of requests that fail with an error
+            response, like an overloaded API
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                payload = {}
+            # Accept any prefix, like /api/v2/compile/read.
+            endpoint = self.path.split('/api/v2/', 1)[-1].strip('/')
+            time.sleep(latency * random.uniform(0.5, 1.5))
+            if random.random() < failure_rate:
+                self._send(200, api._error('Simulated failure'))
+                return
+            response = api.handle(endpoint, payload or {})
+            if response is None:
+                self._send(404, api._error(f'Unknown endpoint {endpoint}'))
+            else:
+                self._send(200, response)
+
+        def do_GET(self):
+            if self.path.rstrip('/') != '/stats':
+                self._send(404, {})
+                return
+            with api._lock:
+                self._send(200, {
+                    'requests': dict(api.requests),
+                    'jobs': dict(api.jobs)
+                })
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the QuantConnect API."
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument(
+        '--latency', type=float, default=0.1,
+        help="Mean seconds added to each response."
+    )
+    parser.add_argument(
+        '--failure-rate', type=float, default=0.0,
+        help="Fraction of requests that fail with an error response."
+    )
+    parser.add_argument(
+        '--compile-seconds', type=float, default=2,
+        help="Time a compile takes."
+    )
+    parser.add_argument(
+        '--compile-error-rate', type=float, default=0.0,
+        help="Fraction of compiles that end in a build error."
+    )
+    parser.add_argument(
+        '--backtest-seconds', type=float, default=20,
+        help="Mean time a backtest takes."
+    )
+    parser.add_argument('--seed', type=int, help="Seed for the random delays and failures.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    api = MockQuantConnect(
+        args.compile_seconds, args.backtest_seconds, args.compile_error_rate
+    )
+    server = ThreadingHTTPServer(
+        (args.host, args.port),
+        make_handler(api, args.latency, args.failure_rate)
+    )
+    print(f"Serving the stand-in API on http://{args.host}:{args.port}/api/v2")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps({'requests': dict(api.requests), 'jobs': dict(api.jobs)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
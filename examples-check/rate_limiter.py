@@ -0,0 +1,76 @@
+"""API rate limiter shared by the regression test's worker processes."""
+import multiprocessing as mp
+import time
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Lanes of API calls, lowest priority first."""
+    READ = 0   # Reads, like polling a compile or backtest's state
+    WRITE = 1  # Calls that start work, like creating a backtest
+
+
+class TokenBucket:
+    """
+    Token bucket kept in shared memory, so every process that inherits it
+    draws from the same budget of API calls.
+
+    The bucket holds up to `burst` tokens and refills at a rate that keeps
+    any `period` window at or under `calls` calls (`burst` plus the refill
+    over the window). Each call takes a token, waiting for one if needed.
+
+    Reads only take a token when no write is waiting for one, so a pool
+    of workers polling their backtests can't delay the calls that start
+    new work.
+    """
+
+    def __init__(self, calls, period, burst):
+        """
+        Create the bucket. Create it before starting the worker processes
+        and pass it to them, so they share it.
+
+        Args:
+            calls: Maximum calls in any window of `period` seconds
+            period: Length of the window, in seconds
+            burst: Maximum calls sent back to back, less than `calls`
+        """
+        self._rate = (calls - burst) / period
+        self._burst = burst
+        self._lock = mp.Lock()
+        self._tokens = mp.RawValue('d', burst)
+        # time.monotonic is the same clock in every process.
+        self._updated = mp.RawValue('d', time.monotonic())
+        self._waiting_writes = mp.RawValue('i', 0)
+
+    def acquire(self, priority=Priority.WRITE):
+        """Wait for a token and take it."""
+        is_write = priority >= Priority.WRITE
+        if is_write:
+            with self._lock:
+                self._waiting_writes.value += 1
+        try:
+            while True:
+                with self._lock:
+                    self._refill()
+                    tokens = self._tokens.value
+                    if tokens >= 1 and (is_write or not self._waiting_writes.value):
+                        self._tokens.value = tokens - 1
+                        return
+                # Wait for the next token. A read that gives way to the
+                # waiting writes waits for the one after it.
+                wait = max(1 - tokens, 0) / self._rate
+                if not is_write:
+                    wait += 1 / self._rate
+                time.sleep(wait)
+        finally:
+            if is_write:
+                with self._lock:
+                    self._waiting_writes.value -= 1
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens.value = min(
+            self._burst,
+            self._tokens.value + (now - self._updated.value) * self._rate
+        )
+        self._updated.value = now
@@ -1,18 +1,33 @@
 """Run backtests for all HuggingFace model variants and output a results table.
 
 Usage:
-    python examples-check/run_model_variants.py
+    python examples-check/run_model_variants.py [--nodes N] [--resume]
+
+Each category's example is compiled once, with the model name read from
+the "model" parameter, and its model variants run as concurrent backtests
+of that compile on N backtest nodes. Results are saved to
+model_variant_results.json after each backtest, so an interrupted run
+can resume where it stopped with --resume, which doesn't backtest the
+variants that passed again. Don't resume after editing the examples.
 
 Credentials (checked in order):
     1. Environment variables: DOCS_REGRESSION_TEST_USER_ID, DOCS_REGRESSION_TEST_USER_TOKEN
     2. LEAN CLI credentials file: ~/.lean/credentials
+
+Set DOCS_REGRESSION_API_URL to use another API server, like
+examples-check/mock_api_server.py.
 """
 import sys
 import os
+import argparse
+import contextlib
 import json
+import re
+import threading
 import time
 import base64
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 try:
@@ -25,6 +40,9 @@ try:
 except ImportError:
     sys.exit("Missing dependency: pip install beautifulsoup4")
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from poller import Poller  # noqa: E402
+
 
 # ---------------------------------------------------------------------------
 # Credentials & API helpers
@@ -48,18 +66,22 @@ def _load_credentials():
     return "", ""
 
 
-BASE_API = "https://www.quantconnect.com/api/v2"
+BASE_API = os.environ.get("DOCS_REGRESSION_API_URL", "https://www.quantconnect.com/api/v2")
 USER_ID, USER_TOKEN = _load_credentials()
 PYTHON_IMPORTS = "from AlgorithmImports import *\n"
 MAX_RETRIES = 5
-POLL_INTERVAL = 10  # seconds between status polls
-BACKTEST_TIMEOUT = 1800  # seconds
+BACKTEST_NODES = 3  # concurrent backtests; the organization's backtest nodes
+MODEL_PARAMETER = "model"
+# Status polls back off between these delays (see poller.py), in seconds.
+COMPILE_POLLER = Poller(initial=1, maximum=10, timeout=300)
+BACKTEST_POLLER = Poller(initial=2, maximum=30, timeout=1800)
 SLOW_THRESHOLD = 300  # seconds; placeholder backtests over this become skip-test
 # Set to a list of category names to skip (e.g. already tested ones)
 SKIP_CATEGORIES = ["Sentiment Analysis"]
 # Reuse an existing project instead of creating new ones (avoids 100/day limit).
 # Set to an integer project ID, or None to always create fresh projects.
 REUSE_PROJECT_ID = 29125823
+RESULTS_PATH = Path(__file__).parent / "model_variant_results.json"
 
 
 def _headers():
@@ -77,6 +99,10 @@ def api_post(endpoint, payload=None):
     ).json()
 
 
+def log(label, msg):
+    print(f"  [{label}] {msg}", flush=True)
+
+
 def clean_code(code):
     return (code
             .replace("&amp;&amp;", "&&")
@@ -120,6 +146,16 @@ def extract_python_code(file_path):
     raise ValueError(f"No testable Python QCAlgorithm block found in {file_path}")
 
 
+def parameterize_model(code, placeholder):
+    """Read the model name from the backtest's parameters, defaulting to the placeholder."""
+    literal = re.compile(r"""(["'])""" + re.escape(placeholder) + r"\1")
+    if not literal.search(code):
+        raise ValueError(f"model name {placeholder!r} not found in the example")
+    return literal.sub(
+        lambda m: f'self.get_parameter("{MODEL_PARAMETER}", {m.group(0)})', code
+    )
+
+
 # ---------------------------------------------------------------------------
 # QC Cloud: create project, compile, backtest
 # ---------------------------------------------------------------------------
@@ -159,42 +195,50 @@ def compile_project(project_id):
     if not compile_id:
         raise RuntimeError(f"no compileId in response: {resp}")
 
-    deadline = time.time() + 300
-    while time.time() < deadline:
-        time.sleep(POLL_INTERVAL)
-        r = api_post("compile/read", {"projectId": project_id, "compileId": compile_id})
-        state = r.get("state") or r.get("compile", {}).get("state", "")
-        if state == "BuildSuccess":
-            return compile_id
-        if state == "BuildError":
-            logs = r.get("logs") or r.get("compile", {}).get("logs", [])
-            raise RuntimeError(f"compile error: {logs[-3:] if logs else r}")
-    raise RuntimeError("compile timed out")
+    def state(r):
+        return r.get("state") or r.get("compile", {}).get("state", "")
 
+    r = COMPILE_POLLER.poll(
+        lambda: api_post("compile/read", {"projectId": project_id, "compileId": compile_id}),
+        lambda r: state(r) in ("BuildSuccess", "BuildError")
+    )
+    if r is None:
+        raise RuntimeError("compile timed out")
+    if state(r) == "BuildError":
+        logs = r.get("logs") or r.get("compile", {}).get("logs", [])
+        raise RuntimeError(f"compile error: {logs[-3:] if logs else r}")
+    return compile_id
 
-def run_backtest(project_id, compile_id, label):
+
+def run_backtest(project_id, compile_id, label, parameters=None):
+    """Run a backtest; returns it with the seconds from its creation until it finished."""
+    start = time.time()
     resp = api_post("backtests/create", {
         "projectId": project_id,
         "compileId": compile_id,
-        "backtestName": label[:64]
+        "backtestName": label[:64],
+        "parameters": parameters or {}
     })
     if not resp.get("success"):
         raise RuntimeError(f"backtest create failed: {resp}")
     bt_id = resp["backtest"]["backtestId"]
 
-    deadline = time.time() + BACKTEST_TIMEOUT
-    while time.time() < deadline:
-        time.sleep(POLL_INTERVAL)
-        r = api_post("backtests/read", {"projectId": project_id, "backtestId": bt_id})
-        bt = r.get("backtest", {})
-        progress = bt.get("progress", 0)
-        completed = bt.get("completed", False)
-        if completed:
-            return bt
-        if bt.get("error"):
-            raise RuntimeError(f"backtest error: {bt['error']}")
-        print(f"    ... {int(progress*100)}% complete")
-    raise RuntimeError("backtest timed out")
+    def read():
+        bt = api_post("backtests/read", {"projectId": project_id, "backtestId": bt_id}).get("backtest", {})
+        if not bt.get("completed") and not bt.get("error"):
+            log(label, f"... {int(bt.get('progress', 0)*100)}% complete")
+        return bt
+
+    bt = BACKTEST_POLLER.poll(
+        read,
+        lambda bt: bt.get("completed") or bt.get("error"),
+        lambda bt: bt.get("progress")
+    )
+    if bt is None:
+        raise RuntimeError("backtest timed out")
+    if not bt.get("completed"):
+        raise RuntimeError(f"backtest error: {bt['error']}")
+    return bt, time.time() - start
 
 
 def extract_stats(bt):
@@ -271,7 +315,34 @@ CATEGORIES = [
 # Main
 # ---------------------------------------------------------------------------
 
+def load_results():
+    """Load the results of a previous run, keyed by (category, model)."""
+    if not RESULTS_PATH.exists():
+        return {}
+    try:
+        rows = json.loads(RESULTS_PATH.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+    return {(cat_name, model): outcome for cat_name, model, outcome in rows}
+
+
+def save_results(results):
+    """Save the results as a list of [category, model, stats | error]."""
+    rows = [[cat_name, model, outcome] for (cat_name, model), outcome in results.items()]
+    tmp_path = RESULTS_PATH.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(rows, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp_path, RESULTS_PATH)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Backtest the HuggingFace model variants.")
+    parser.add_argument("--nodes", type=int, default=BACKTEST_NODES,
+                        help="Backtests to run at once (default: %(default)s).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the saved results of an interrupted run and only "
+                             "backtest the variants that didn't pass.")
+    args = parser.parse_args()
+
     if not USER_ID or not USER_TOKEN:
         sys.exit(
             "Error: Set DOCS_REGRESSION_TEST_USER_ID and "
@@ -283,55 +354,77 @@ def main():
         sys.exit("API authentication failed. Check your credentials.")
     print("API authentication successful.\n")
 
-    results = []  # list of (category, model, stats_dict | error_str)
+    results = load_results() if args.resume else {}
+    results_lock = threading.Lock()
 
-    for cat in CATEGORIES:
-        if cat["name"] in SKIP_CATEGORIES:
-            print(f"\nSkipping: {cat['name']}")
-            continue
-        print(f"\n{'='*60}")
-        print(f"Category: {cat['name']}")
-        print(f"{'='*60}")
+    def record(cat_name, model, outcome):
+        with results_lock:
+            results[(cat_name, model)] = outcome
+            save_results(results)
 
+    def run_variant(cat, project_id, compile_id, model):
+        label = f"{cat['name'][:8]}_{model.split('/')[-1][:20]}"
         try:
-            base_code = extract_python_code(str(cat["file"]))
+            log(label, "Running backtest...")
+            bt, bt_elapsed = run_backtest(
+                project_id, compile_id, label, {MODEL_PARAMETER: model}
+            )
+
+            if model == cat["placeholder"] and bt_elapsed > SLOW_THRESHOLD:
+                mark_skip_test(str(cat["file"]))
+
+            stats = extract_stats(bt)
+            log(label, f"PASS — net profit={stats['net_profit']}  "
+                       f"drawdown={stats['drawdown']}  sharpe={stats['sharpe']}  "
+                       f"({int(bt_elapsed)}s)")
+            record(cat["name"], model, stats)
         except Exception as e:
-            print(f"  ERROR reading code: {e}")
-            for model in cat["models"]:
-                results.append((cat["name"], model, f"code read error: {e}"))
-            continue
-
-        for model in cat["models"]:
-            label = f"{cat['name'][:8]}_{model.split('/')[-1][:20]}"
-            print(f"\n  Model: {model}")
+            log(label, f"FAIL — {e}")
+            record(cat["name"], model, f"FAIL: {e}")
+
+    def run_category(cat):
+        # With --resume, variants that passed before aren't backtested again.
+        models = [m for m in cat["models"]
+                  if not isinstance(results.get((cat["name"], m)), dict)]
+        if not models:
+            print(f"\nAll variants of {cat['name']} already passed.")
+            return
+        label = cat["name"][:8]
+        # Categories that share a project take turns, since each one
+        # replaces its code.
+        with project_lock:
             try:
-                code = base_code.replace(cat["placeholder"], model)
-
-                print(f"  Creating project...")
+                code = parameterize_model(
+                    extract_python_code(str(cat["file"])), cat["placeholder"]
+                )
+                log(label, "Uploading...")
                 project_id = create_project_and_upload(code, label)
-
-                print(f"  Compiling (project {project_id})...")
+                log(label, f"Compiling (project {project_id})...")
                 compile_id = compile_project(project_id)
-
-                print(f"  Running backtest...")
-                bt_start = time.time()
-                bt = run_backtest(project_id, compile_id, label)
-                bt_elapsed = time.time() - bt_start
-
-                if model == cat["placeholder"] and bt_elapsed > SLOW_THRESHOLD:
-                    mark_skip_test(str(cat["file"]))
-
-                stats = extract_stats(bt)
-                print(f"  PASS — net profit={stats['net_profit']}  "
-                      f"drawdown={stats['drawdown']}  sharpe={stats['sharpe']}  "
-                      f"({int(bt_elapsed)}s)")
-                results.append((cat["name"], model, stats))
-
             except Exception as e:
-                import traceback
-                traceback.print_exc()
-                print(f"  FAIL — {e}")
-                results.append((cat["name"], model, f"FAIL: {e}"))
+                log(label, f"ERROR preparing the project: {e}")
+                for model in models:
+                    record(cat["name"], model, f"FAIL: {e}")
+                return
+            futures = [
+                backtest_pool.submit(run_variant, cat, project_id, compile_id, model)
+                for model in models
+            ]
+            for future in futures:
+                future.result()
+
+    categories = [cat for cat in CATEGORIES if cat["name"] not in SKIP_CATEGORIES]
+    for cat in CATEGORIES:
+        if cat not in categories:
+            print(f"\nSkipping: {cat['name']}")
+    print(f"\nRunning {len(categories)} categories on {args.nodes} backtest nodes.")
+    # A reused project holds one category's code at a time; fresh
+    # projects let the categories run side by side.
+    project_lock = threading.Lock() if REUSE_PROJECT_ID else contextlib.nullcontext()
+    with ThreadPoolExecutor(args.nodes) as backtest_pool, \
+            ThreadPoolExecutor(max(1, len(categories))) as category_pool:
+        for future in [category_pool.submit(run_category, cat) for cat in categories]:
+            future.result()
 
     # -----------------------------------------------------------------------
     # Print results table
@@ -341,14 +434,17 @@ def main():
     print("="*80)
     print()
 
-    # Group by category
+    # Group by category, in the order of CATEGORIES
     categories_seen = []
     rows_by_cat = {}
-    for cat_name, model, stats in results:
-        if cat_name not in rows_by_cat:
-            rows_by_cat[cat_name] = []
-            categories_seen.append(cat_name)
-        rows_by_cat[cat_name].append((model, stats))
+    for cat in CATEGORIES:
+        for model in cat["models"]:
+            if (cat["name"], model) not in results:
+                continue
+            if cat["name"] not in rows_by_cat:
+                rows_by_cat[cat["name"]] = []
+                categories_seen.append(cat["name"])
+            rows_by_cat[cat["name"]].append((model, results[(cat["name"], model)]))
 
     for cat_name in categories_seen:
         rows = rows_by_cat[cat_name]
@@ -365,11 +461,7 @@ def main():
                 print(f"| `{model}` | {stats} | — | — |")
         print()
 
-    # Also dump raw JSON for debugging
-    output_path = Path(__file__).parent / "model_variant_results.json"
-    with open(output_path, "w") as f:
-        json.dump(results, f, indent=2, default=str)
-    print(f"Raw results saved to {output_path}")
+    print(f"Raw results saved to {RESULTS_PATH}")
 
 
 if __name__ == "__main__":
@@ -23,9 +23,10 @@
 #   - HTML anchors:    <a href="url">
 #
 # Each link is checked for:
-#   - HTTP errors: GET each URL, flag 4xx responses and soft-404 pages. A 401/403
-#     is re-checked with a browser-impersonating client (curl_cffi) first, since
-#     many sites bot-block plain HTTP clients on otherwise-valid links. If that
+#   - HTTP errors: probe each URL (HEAD, falling back to a one-byte ranged GET),
+#     flag 4xx responses and soft-404 pages. A 401/403 is re-checked with a
+#     browser-impersonating client (curl_cffi) first, since many sites
+#     bot-block plain HTTP clients on otherwise-valid links. If that
 #     re-check reveals a real 404, it's escalated to a failing error (so a dead
 #     link can't hide behind a 403); if it still can't verify, it stays a warning.
 #   - Missing sections: a #fragment into the QuantConnect docs is validated against
@@ -44,26 +45,44 @@
 #   pip install aiohttp
 #   python external_url_check.py <repo_dir> [<repo_dir> ...]
 #   python external_url_check.py --report broken-links-report.md <repo_dir> ...
+#   python external_url_check.py --json run.json --junit run.xml <repo_dir> ...
+#       (also write machine-readable reports, see link_metrics.py)
 #
 # Each <repo_dir> is the root of a cloned repository. The directory name is used
 # as the repo label in the output.
+#
+# Repo files are read on a process pool; each link's HTTP check starts as soon as
+# the link is first found, while the rest of the repos are still being read. Links
+# shared by many repos (docs landing pages, licenses, brokerage sites) are checked
+# over HTTP once per run, and the result is reported for every repo and file.
 
 import argparse
 import asyncio
+import contextlib
 import datetime
+import os
 import re
 import sys
 import time
 from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import aiohttp
 from curl_cffi.requests import AsyncSession
 
 from doc_anchors import build_file_index, check_deprecated_path, check_section_anchor
+from link_http import HostScheduler, make_connector, probe
+from link_metrics import LinkMetrics
 
 # -- Constants ----------------------------------------------------------------
-CONCURRENCY = 50          # simultaneous HTTP requests
+CONCURRENCY = 50          # simultaneous HTTP requests, across all hosts
+SCAN_CHUNK = 16           # files per process-pool extraction job
+RECHECK_WORKERS = 8       # concurrent browser re-checks of 401/403 links
+RECHECK_SESSIONS = 2      # long-lived curl_cffi sessions the re-checks share
+RECHECK_ATTEMPTS = 3      # browser re-check attempts before a link counts as blocked
+RECHECK_BACKOFF = 2       # seconds a host backs off after a blocked attempt (doubles)
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
 
 # File extensions whose links we scan. Markdown is where the docs/prose live.
@@ -145,14 +164,20 @@ def extract_links(text: str) -> set[str]:
     return {u for u in links if u and not any(c in u for c in "{}$<>")}
 
 
-def collect_links(repo_dir: Path) -> dict[str, list[Path]]:
-    """Walk a repo and return {link: [files it appears in]} for scannable files."""
+def scannable_files(repo_dir: Path) -> list[Path]:
+    """The repo's files whose links are scanned, in path order (.git is skipped)."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(repo_dir):
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        paths.extend(Path(dirpath, fn) for fn in filenames
+                     if Path(fn).suffix.lower() in SCAN_EXTENSIONS)
+    return sorted(paths)
+
+
+def collect_links(paths: list[Path]) -> dict[str, list[Path]]:
+    """Read the given files and return {link: [files it appears in]}."""
     link_files: dict[str, list[Path]] = {}
-    for path in sorted(repo_dir.rglob("*")):
-        if path.suffix.lower() not in SCAN_EXTENSIONS or not path.is_file():
-            continue
-        if ".git" in path.parts:
-            continue
+    for path in paths:
         try:
             text = path.read_text(encoding="utf-8", errors="replace")
         except Exception:
@@ -162,112 +187,216 @@ def collect_links(repo_dir: Path) -> dict[str, list[Path]]:
     return link_files
 
 
+def scan_repos(pool: ProcessPoolExecutor, repo_dirs: list[Path]) -> dict[Path, list[asyncio.Future]]:
+    """Queue every repo's files on the process pool, SCAN_CHUNK files per job.
+
+    Returns each repo's collect_links() jobs, in file order. Jobs run in the order
+    they were queued, so the first repo's links arrive while later repos are
+    still being read.
+    """
+    loop = asyncio.get_running_loop()
+    jobs = {}
+    for repo_dir in repo_dirs:
+        paths = scannable_files(repo_dir)
+        jobs[repo_dir] = [loop.run_in_executor(pool, collect_links, paths[i:i + SCAN_CHUNK])
+                          for i in range(0, len(paths), SCAN_CHUNK)]
+    return jobs
+
+
 # -- HTTP checking ------------------------------------------------------------
 
 def _is_external(url: str) -> bool:
     return url.startswith("http://") or url.startswith("https://")
 
 
-async def _browser_recheck(url: str) -> str:
-    """Re-check a 401/403 with a browser-impersonating client (Chrome TLS fingerprint).
+class BrowserRechecker:
+    """Re-checks 401/403 URLs with a browser-impersonating client (Chrome TLS fingerprint).
 
     Many sites (FINRA, Coinbase, Bitfinex, CoinAPI, ...) serve 401/403 to plain
     HTTP clients based on TLS/header fingerprinting even though the link is valid;
-    curl_cffi mimics a real browser and gets through. Returns:
+    curl_cffi mimics a real browser and gets through. recheck() returns:
       - "ok"      : a real 2xx (or 429 - server is live, just rate-limiting)
       - "broken"  : a definitive 404/410 the block was hiding (a genuinely dead link)
       - "blocked" : still can't verify (e.g. a hard WAF) - report but don't fail
+
+    Rechecks run on their own queue, off the main request slots, served by a few
+    workers sharing RECHECK_SESSIONS long-lived sessions. A blocked attempt backs
+    its host off (RECHECK_BACKOFF, doubling per attempt) and its retry is scheduled
+    for when the backoff ends, so no worker sleeps while other URLs wait. New URLs
+    of a host that's backing off wait for the backoff too.
     """
-    for attempt in range(3):
+
+    def __init__(self, workers: int = RECHECK_WORKERS, sessions: int = RECHECK_SESSIONS):
+        self._queue: asyncio.Queue[tuple[str, int, asyncio.Future]] = asyncio.Queue()
+        self._host_ready: dict[str, float] = {}   # host -> monotonic time its backoff ends
+        self._timers: set[asyncio.TimerHandle] = set()
+        self._sessions = [AsyncSession(impersonate="chrome") for _ in range(sessions)]
+        self._workers = [asyncio.create_task(self._work(self._sessions[i % sessions]))
+                         for i in range(workers)]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        for timer in self._timers:
+            timer.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for session in self._sessions:
+            await session.close()
+
+    async def recheck(self, url: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        wait = self._host_ready.get(urlsplit(url).netloc.lower(), 0.0) - time.monotonic()
+        if wait > 0:
+            self._schedule(wait, (url, 0, future))   # the host is backing off
+        else:
+            self._queue.put_nowait((url, 0, future))
+        return await future
+
+    def _schedule(self, delay: float, item: tuple[str, int, asyncio.Future]):
+        def put():
+            self._timers.discard(timer)
+            self._queue.put_nowait(item)
+        timer = asyncio.get_running_loop().call_later(delay, put)
+        self._timers.add(timer)
+
+    @staticmethod
+    async def _attempt(session: AsyncSession, url: str) -> str | None:
+        """One browser-like GET. None means a transient block worth retrying."""
         try:
-            async with AsyncSession() as s:
-                r = await s.get(url, impersonate="chrome", timeout=30, allow_redirects=True)
-            code = r.status_code
-            if 200 <= code < 300:
-                return "broken" if str(r.url).rstrip("/").endswith("/404") else "ok"
-            if code in (404, 410):
-                return "broken"        # the block was hiding a genuinely dead link
-            if code == 429:
-                return "ok"            # rate-limited => server is live, link exists
-            # 401/403/5xx: transient block or rate-limit - back off and retry
+            r = await session.get(url, timeout=30, allow_redirects=True)
         except Exception:
-            pass
-        await asyncio.sleep(2 * (attempt + 1))   # 2s, 4s
-    return "blocked"
-
-
-async def check_url(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
-                    url: str, files: list[Path], repo_dir: Path,
-                    findings: list[Finding], broken_pages: set[str]):
-    """Check a single external URL for errors. Records page-level breakage (404 /
-    soft-404) in broken_pages so a redundant on-disk finding isn't also reported.
+            return None
+        code = r.status_code
+        if 200 <= code < 300:
+            return "broken" if str(r.url).rstrip("/").endswith("/404") else "ok"
+        if code in (404, 410):
+            return "broken"        # the block was hiding a genuinely dead link
+        if code == 429:
+            return "ok"            # rate-limited => server is live, link exists
+        return None                # 401/403/5xx: transient block or rate-limit
+
+    async def _work(self, session: AsyncSession):
+        while True:
+            url, attempt, future = await self._queue.get()
+            verdict = await self._attempt(session, url)
+            if verdict is not None:
+                future.set_result(verdict)
+            elif attempt + 1 >= RECHECK_ATTEMPTS:
+                future.set_result("blocked")
+            else:
+                delay = RECHECK_BACKOFF * 2 ** attempt
+                host = urlsplit(url).netloc.lower()
+                self._host_ready[host] = max(self._host_ready.get(host, 0.0),
+                                             time.monotonic() + delay)
+                self._schedule(delay, (url, attempt + 1, future))
+
+
+async def check_url(session: aiohttp.ClientSession, scheduler: HostScheduler,
+                    rechecker: BrowserRechecker, url: str, broken_pages: set[str],
+                    metrics: LinkMetrics | None = None) -> list[tuple[str, str]]:
+    """Check a single external URL for errors, returning its (category, reason)
+    findings. Records page-level breakage (404 / soft-404) in broken_pages so a
+    redundant on-disk finding isn't also reported.
 
     A 401/403 is re-checked with a browser-impersonating client before warning, so
-    bot-blocked-but-valid links don't generate noise."""
-    async with semaphore:
-        try:
-            async with session.get(
-                url, allow_redirects=True,
-                timeout=aiohttp.ClientTimeout(total=60),
-            ) as resp:
-                match resp.status:
-                    case 400:
-                        findings.append(_finding("400", "400 Bad Request", url, files, repo_dir))
-                    case 401 | 403:
-                        # Likely bot/WAF blocking - re-check with a browser-like client.
-                        verdict = await _browser_recheck(url)
-                        if verdict == "broken":
-                            # The block was hiding a genuinely dead link - fail on it.
-                            findings.append(_finding(
-                                "404", "404 Not found (confirmed via browser re-check)",
-                                url, files, repo_dir))
-                            broken_pages.add(url)
-                        elif verdict == "blocked":
-                            cat = str(resp.status)
-                            msg = f"{resp.status} {'Unauthorized' if resp.status == 401 else 'Forbidden'}"
-                            findings.append(_finding(cat, msg, url, files, repo_dir))
-                        # verdict == "ok" -> link is valid, no finding
-                    case 404:
-                        findings.append(_finding("404", "404 Not found", url, files, repo_dir))
-                        broken_pages.add(url)
-                    case 200:
-                        # Soft 404: site redirected us to its /404 page.
-                        if str(resp.url).rstrip("/").endswith("/404"):
-                            findings.append(_finding("soft_404", "Soft 404 (page not found)",
-                                                     url, files, repo_dir))
-                            broken_pages.add(url)
-        except Exception:
-            findings.append(_finding("failed_request", "Failed to request", url, files, repo_dir))
+    bot-blocked-but-valid links don't generate noise.
+
+    The result doesn't depend on which repo or file links to the URL, so each
+    unique URL is checked once and its findings are fanned out by check_repo."""
+    start = time.perf_counter()
+    found = await _check_url_http(session, scheduler, rechecker, url, broken_pages)
+    if metrics:
+        metrics.record(url, [category for category, _ in found], time.perf_counter() - start)
+    return found
+
+
+async def _check_url_http(session: aiohttp.ClientSession, scheduler: HostScheduler,
+                          rechecker: BrowserRechecker, url: str,
+                          broken_pages: set[str]) -> list[tuple[str, str]]:
+    found: list[tuple[str, str]] = []
+
+    async def handle(resp: aiohttp.ClientResponse, status: int):
+        match status:
+            case 400:
+                found.append(("400", "400 Bad Request"))
+            case 401 | 403:
+                return status   # re-checked below, once the request slot is released
+            case 404:
+                found.append(("404", "404 Not found"))
+                broken_pages.add(url)
+            case 200:
+                # Soft 404: site redirected us to its /404 page.
+                if str(resp.url).rstrip("/").endswith("/404"):
+                    found.append(("soft_404", "Soft 404 (page not found)"))
+                    broken_pages.add(url)
+
+    try:
+        blocked_status = await probe(scheduler, session, url, handle)
+    except Exception:
+        found.append(("failed_request", "Failed to request"))
+        return found
+
+    if blocked_status:
+        # Likely bot/WAF blocking - re-check with a browser-like client.
+        verdict = await rechecker.recheck(url)
+        if verdict == "broken":
+            # The block was hiding a genuinely dead link - fail on it.
+            found.append(("404", "404 Not found (confirmed via browser re-check)"))
+            broken_pages.add(url)
+        elif verdict == "blocked":
+            msg = f"{blocked_status} {'Unauthorized' if blocked_status == 401 else 'Forbidden'}"
+            found.append((str(blocked_status), msg))
+        # verdict == "ok" -> link is valid, no finding
+    return found
 
 
 # -- Per-repo driver ----------------------------------------------------------
 
-async def check_repo(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
-                     repo_dir: Path, findings: list[Finding],
+async def check_repo(session: aiohttp.ClientSession, scheduler: HostScheduler,
+                     rechecker: BrowserRechecker, repo_dir: Path, jobs: list[asyncio.Future],
+                     checks: dict[str, asyncio.Task], findings: list[Finding],
                      file_index: dict[str, list[str]],
-                     deferred: list[Finding], broken_pages: set[str]) -> int:
-    """Scan one repo. Returns the number of external links checked over HTTP."""
-    link_files = collect_links(repo_dir)
-
-    tasks = []
-    for url, files in link_files.items():
-        if not _is_external(url):
-            continue   # anchors / mailto: are left alone
+                     deferred: list[Finding], broken_pages: set[str],
+                     metrics: LinkMetrics | None = None) -> int:
+    """Check one repo's links as its scan jobs (see scan_repos) complete.
 
+    `checks` is shared by all repos: a link's HTTP check starts the first time any
+    repo links to it, and every other repo linking to it reuses that result.
+    Returns the number of external links in this repo."""
+    link_files: dict[str, list[Path]] = {}
+    for job in jobs:
+        for url, files in (await job).items():
+            if url in link_files:
+                link_files[url].extend(files)
+                continue
+            link_files[url] = files
+            # anchors / mailto: are left alone
+            if _is_external(url) and url not in checks:
+                checks[url] = asyncio.create_task(
+                    check_url(session, scheduler, rechecker, url, broken_pages, metrics))
+    external = {url: files for url, files in link_files.items() if _is_external(url)}
+    print(f"Scanned {repo_dir.name}: {len(external)} external link(s).", flush=True)
+
+    for url, files in external.items():
         # On-disk checks (no HTTP). Deferred until HTTP is done so we can drop
         # them when the page itself turns out to be 404/soft-404.
-        reason = check_section_anchor(url, DOCS_BASE, file_index, path_aliases=PATH_ALIASES)
+        with metrics.phase("anchors") if metrics else contextlib.nullcontext():
+            reason = check_section_anchor(url, DOCS_BASE, file_index,
+                                          path_aliases=PATH_ALIASES)
         if reason:
             deferred.append(_finding("missing_section", reason, url, files, repo_dir))
         deprecated = check_deprecated_path(url)
         if deprecated:
             deferred.append(_finding("deprecated_path", deprecated, url, files, repo_dir))
 
-        tasks.append(check_url(session, semaphore, url, files, repo_dir, findings, broken_pages))
-
-    for coro in asyncio.as_completed(tasks):
-        await coro
-    return len(tasks)
+    # Fan the shared HTTP results out to this repo's files.
+    for url, files in external.items():
+        findings.extend(_finding(category, reason, url, files, repo_dir)
+                        for category, reason in await checks[url])
+    return len(external)
 
 
 # -- Reporting ----------------------------------------------------------------
@@ -324,6 +453,10 @@ async def main():
     parser.add_argument("repos", nargs="+", help="Paths to cloned repository roots.")
     parser.add_argument("--report", metavar="PATH",
                         help="Also write a per-repo Markdown report to PATH.")
+    parser.add_argument("--json", metavar="PATH",
+                        help="Also write per-URL timings, retries and categories as JSON to PATH.")
+    parser.add_argument("--junit", metavar="PATH",
+                        help="Also write a JUnit XML report (one testcase per URL) to PATH.")
     args = parser.parse_args()
 
     repo_dirs = [Path(p).resolve() for p in args.repos]
@@ -333,57 +466,82 @@ async def main():
             sys.exit(2)
 
     start = time.perf_counter()
-    semaphore = asyncio.Semaphore(CONCURRENCY)
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY, limit_per_host=20)
+    scheduler = HostScheduler(CONCURRENCY)
+    metrics = LinkMetrics("external_url_check") if args.json or args.junit else None
+    phase = metrics.phase if metrics else lambda name: contextlib.nullcontext()
 
     print(f"Indexing docs pages under {DOCS_BASE.name} for anchor checks ...", flush=True)
-    file_index = build_file_index(DOCS_BASE)
+    with phase("index"):
+        file_index = build_file_index(DOCS_BASE)
 
-    total_links = 0
     findings: list[Finding] = []
     deferred: list[Finding] = []
     broken_pages: set[str] = set()
-    async with aiohttp.ClientSession(
-        connector=connector, headers={"User-Agent": USER_AGENT},
-    ) as session:
-        for repo_dir in repo_dirs:
-            print(f"Scanning {repo_dir.name} ...", flush=True)
-            total_links += await check_repo(session, semaphore, repo_dir, findings,
-                                            file_index, deferred, broken_pages)
+    # Repos are read on a process pool while their links are already being checked.
+    print(f"Scanning {len(repo_dirs)} repo(s) ...", flush=True)
+    # Scanning is pipelined with the HTTP checks, so the "scan" phase overlaps "http".
+    with ProcessPoolExecutor() as pool, phase("http"):
+        async with aiohttp.ClientSession(
+            connector=make_connector(CONCURRENCY), headers={"User-Agent": USER_AGENT},
+            trace_configs=[metrics.trace_config()] if metrics else None,
+        ) as session, BrowserRechecker() as rechecker:
+            scan_start = time.perf_counter()
+            jobs = scan_repos(pool, repo_dirs)
+            if metrics:
+                scanned = asyncio.gather(*(job for js in jobs.values() for job in js))
+                scanned.add_done_callback(
+                    lambda _: metrics.add_phase("scan", time.perf_counter() - scan_start))
+            checks: dict[str, asyncio.Task] = {}
+            total_links = sum(await asyncio.gather(*(
+                check_repo(session, scheduler, rechecker, repo_dir, jobs[repo_dir], checks,
+                           findings, file_index, deferred, broken_pages, metrics)
+                for repo_dir in repo_dirs
+            )))
 
     # Keep on-disk findings only for pages that actually resolve - if the page is
     # itself 404/soft-404 that's already reported, so don't double-count it.
     findings.extend(f for f in deferred if f.url not in broken_pages)
-
-    print(f"\nChecked {total_links} unique links across {len(repo_dirs)} repo(s) "
-          f"in {time.perf_counter() - start:.2f}s")
-
-    # Report to console, grouped by category in severity order.
-    by_cat: dict[str, list[Finding]] = defaultdict(list)
-    for f in findings:
-        by_cat[f.category].append(f)
-
-    error_count = warning_count = 0
-    for category in SEVERITY:
-        items = by_cat.get(category, [])
-        if not items:
-            continue
-        is_error = SEVERITY[category] == "error"
-        label = "ERROR" if is_error else "WARNING"
-        if is_error:
-            error_count += len(items)
-        else:
-            warning_count += len(items)
-        print(f"\n{'=' * 60}\n{label}S - {category} ({len(items)}):\n{'=' * 60}")
-        for f in items:
-            print(f"  {label}: {_fmt_console(f)}")
-
-    print(f"\n{'-' * 60}")
-    print(f"Summary: {error_count} error(s), {warning_count} warning(s)")
-    print(f"{'-' * 60}")
-
-    if args.report:
-        write_markdown_report(Path(args.report), findings, len(repo_dirs))
+    if metrics:
+        for f in deferred:
+            if f.url not in broken_pages:
+                metrics.record(f.url, [f.category], None)
+
+    print(f"\nChecked {len(checks)} unique links ({total_links} per-repo links) across "
+          f"{len(repo_dirs)} repo(s) in {time.perf_counter() - start:.2f}s")
+
+    with phase("report"):
+        # Report to console, grouped by category in severity order.
+        by_cat: dict[str, list[Finding]] = defaultdict(list)
+        for f in findings:
+            by_cat[f.category].append(f)
+
+        error_count = warning_count = 0
+        for category in SEVERITY:
+            items = by_cat.get(category, [])
+            if not items:
+                continue
+            is_error = SEVERITY[category] == "error"
+            label = "ERROR" if is_error else "WARNING"
+            if is_error:
+                error_count += len(items)
+            else:
+                warning_count += len(items)
+            print(f"\n{'=' * 60}\n{label}S - {category} ({len(items)}):\n{'=' * 60}")
+            for f in items:
+                print(f"  {label}: {_fmt_console(f)}")
+
+        print(f"\n{'-' * 60}")
+        print(f"Summary: {error_count} error(s), {warning_count} warning(s)")
+        print(f"{'-' * 60}")
+
+        if args.report:
+            write_markdown_report(Path(args.report), findings, len(repo_dirs))
+
+    if args.json:
+        metrics.write_json(Path(args.json), SEVERITY,
+                           {category: len(items) for category, items in by_cat.items()})
+    if args.junit:
+        metrics.write_junit(Path(args.junit), SEVERITY)
 
     if error_count > 0:
         print(f"\nFAILED: {error_count} broken link(s) found.")
@@ -0,0 +1,390 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Offline throughput benchmark for url_check.py and external_url_check.py.
+#
+# Starts a local aiohttp stand-in for "the internet" and runs both checkers, end to
+# end, against a synthetic tree that links only to it:
+#   - url_check.main over N numbered .html doc files (plus documentation-map.json),
+#   - external_url_check.main over --repos copies of a repo of N .md files.
+# Together the files reference M distinct URLs, drawn from a configurable mix of
+# responses:
+#   ok        200
+#   missing   404
+#   soft404   302 to a /404 page that answers 200
+#   forbidden 403 (external_url_check re-checks these with curl_cffi, retrying with
+#             backoff, which puts a several-second floor under the run; off by default)
+#   throttle  429 with Retry-After on the first hit of each URL, 200 afterwards
+#             (Retry-After defaults to 0, so the AIMD backoff is exercised without
+#             the pauses dominating the wall time)
+#   redirect  a chain of --redirect-hops 302s ending at a 200
+# Every response is delayed by --latency-ms (+/- --jitter-ms). The URLs are spread
+# over --hosts loopback addresses (127.0.0.1, 127.0.0.2, ...), so per-host
+# scheduling is exercised too.
+#
+# Each checker runs in its own (forked) process, so its peak RSS is measured on
+# its own. Request latency is measured client-side with an aiohttp TraceConfig.
+# Reported per checker: URLs/sec, requests sent, p50/p95/p99 request latency and
+# peak RSS.
+#
+# Usage:
+#   python link_check_benchmark.py                            # defaults below
+#   python link_check_benchmark.py --files 5000 --links 20000 --latency-ms 50
+#   python link_check_benchmark.py --json bench.json          # save the results
+#   python link_check_benchmark.py --compare bench.json       # exit 1 on regression
+#
+# Linux only (the checkers are patched in forked children).
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import random
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+DEFAULT_MIX = "ok=85,missing=5,soft404=3,forbidden=0,throttle=3,redirect=4"
+REGRESSION_TOLERANCE = 0.10   # allowed URLs/sec drop vs. --compare before failing
+
+
+# -- Stand-in server ------------------------------------------------------------
+
+def _make_app(latency: float, jitter: float, redirect_hops: int, retry_after: int,
+              seed: int) -> web.Application:
+    rng = random.Random(seed)
+    throttled: set[str] = set()
+
+    async def delay():
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+
+    async def ok(request: web.Request):
+        await delay()
+        return web.Response(text="<html><body>ok</body></html>", content_type="text/html")
+
+    async def missing(request: web.Request):
+        await delay()
+        return web.Response(status=404, text="not found")
+
+    async def soft404(request: web.Request):
+        await delay()
+        raise web.HTTPFound("/404")
+
+    async def page_404(request: web.Request):
+        await delay()
+        return web.Response(text="<html><body>Page not found</body></html>",
+                            content_type="text/html")
+
+    async def forbidden(request: web.Request):
+        await delay()
+        return web.Response(status=403, text="forbidden")
+
+    async def throttle(request: web.Request):
+        await delay()
+        key = request.match_info["n"]
+        if key not in throttled:
+            throttled.add(key)
+            return web.Response(status=429, headers={"Retry-After": str(retry_after)})
+        return web.Response(text="ok")
+
+    async def redirect(request: web.Request):
+        await delay()
+        n, hop = request.match_info["n"], int(request.match_info["hop"])
+        if hop >= redirect_hops:
+            return web.Response(text="ok")
+        raise web.HTTPFound(f"/redirect/{n}/{hop + 1}")
+
+    app = web.Application()
+    app.router.add_route("*", "/ok/{n}", ok)
+    app.router.add_route("*", "/missing/{n}", missing)
+    app.router.add_route("*", "/soft404/{n}", soft404)
+    app.router.add_route("*", "/404", page_404)
+    app.router.add_route("*", "/forbidden/{n}", forbidden)
+    app.router.add_route("*", "/throttle/{n}", throttle)
+    app.router.add_route("*", "/redirect/{n}/{hop}", redirect)
+    return app
+
+
+def _serve(hosts: list[str], port: int, opts: dict):
+    web.run_app(_make_app(**opts), host=hosts, port=port, print=None,
+                access_log=None, handle_signals=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(host: str, port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection((host, port), timeout=1):
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"stand-in server didn't start on {host}:{port}")
+
+
+# -- Synthetic tree -------------------------------------------------------------
+
+def _parse_mix(mix: str) -> list[tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in {"ok", "missing", "soft404", "forbidden", "throttle", "redirect"}:
+            raise argparse.ArgumentTypeError(f"unknown response kind: {kind}")
+        weights.append((kind, float(weight)))
+    return weights
+
+
+def _make_urls(count: int, mix: list[tuple[str, float]], hosts: list[str], port: int,
+               rng: random.Random) -> list[str]:
+    kinds = rng.choices([k for k, _ in mix], weights=[w for _, w in mix], k=count)
+    urls = []
+    for i, kind in enumerate(kinds):
+        path = f"/redirect/{i}/0" if kind == "redirect" else f"/{kind}/{i}"
+        urls.append(f"http://{hosts[i % len(hosts)]}:{port}{path}")
+    return urls
+
+
+def _spread(urls: list[str], files: int, per_file: int, rng: random.Random) -> list[list[str]]:
+    """Assign links to files: every URL appears at least once, then random repeats."""
+    slots: list[list[str]] = [[] for _ in range(files)]
+    for i, url in enumerate(urls):
+        slots[i % files].append(url)
+    for links in slots:
+        links.extend(rng.choices(urls, k=max(0, per_file - len(links))))
+    return slots
+
+
+def _write_doc_tree(root: Path, slots: list[list[str]]):
+    """A numbered-folder docs tree like this repo's, for url_check.py."""
+    root.mkdir(parents=True)
+    (root / "documentation-map.json").write_text("{}", encoding="utf-8")
+    for i, links in enumerate(slots):
+        folder = root / f"{i // 100 + 1:02} Section {i // 100 + 1}"
+        folder.mkdir(exist_ok=True)
+        body = "\n".join(f'<p>See <a href="{url}">this page</a> for details.</p>' for url in links)
+        (folder / f"{i % 100 + 1:02} Page {i}.html").write_text(body + "\n", encoding="utf-8")
+
+
+def _write_repo(root: Path, slots: list[list[str]]):
+    """A cloned Lean.* repo's worth of Markdown, for external_url_check.py."""
+    (root / "docs").mkdir(parents=True)
+    for i, links in enumerate(slots):
+        body = "\n".join(f"- [link {j}]({url})" for j, url in enumerate(links))
+        (root / "docs" / f"page{i}.md").write_text(f"# Page {i}\n\n{body}\n", encoding="utf-8")
+
+
+# -- Running a checker ----------------------------------------------------------
+
+def _traced_sessions(latencies: list[float]):
+    """Make every aiohttp.ClientSession record each request's duration."""
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        latencies.append(time.perf_counter() - ctx.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_end)
+    client_session = aiohttp.ClientSession
+
+    def traced_session(*args, trace_configs=None, **kwargs):
+        # Keep the checker's own trace configs, if it passes any.
+        return client_session(*args, trace_configs=[*(trace_configs or ()), trace_config],
+                              **kwargs)
+
+    aiohttp.ClientSession = traced_session
+
+
+def _run_url_check(doc_root: Path) -> int:
+    import url_check
+    url_check.BASE_PATH = doc_root
+    url_check.DOC_MAP = doc_root / "documentation-map.json"
+    url_check.STRATEGY_PHP = doc_root / "no-strategy-library.php"
+    url_check.IGNORE_FILES = set()
+    url_check.CACHE_FILE = doc_root / ".url_check_cache.sqlite"
+    url_check.SNAPSHOT_FILE = doc_root / ".url_check_snapshot.json"
+    sys.argv = ["url_check.py", "--no-cache"]
+    asyncio.run(url_check.main())
+    return 0
+
+
+def _run_external_url_check(repo_roots: list[Path], doc_root: Path) -> int:
+    import external_url_check
+    external_url_check.DOCS_BASE = doc_root
+    sys.argv = ["external_url_check.py", *map(str, repo_roots)]
+    asyncio.run(external_url_check.main())
+    return 0
+
+
+def _child(target, args, conn):
+    latencies: list[float] = []
+    _traced_sessions(latencies)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            target(*args)
+        except SystemExit:
+            pass   # the checkers exit 1 when they find broken links - expected here
+    elapsed = time.perf_counter() - start
+    conn.send({"elapsed": elapsed, "latencies": latencies,
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+    conn.close()
+
+
+def _measure(name: str, target, args, url_count: int) -> dict:
+    ctx = mp.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(target, args, child))
+    proc.start()
+    child.close()
+    stats = parent.recv()
+    proc.join()
+
+    latencies = sorted(stats["latencies"])
+
+    def pct(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    return {
+        "checker": name,
+        "urls": url_count,
+        "seconds": round(stats["elapsed"], 3),
+        "urls_per_sec": round(url_count / stats["elapsed"], 1),
+        "requests": len(latencies),
+        "p50_ms": round(pct(0.50), 1),
+        "p95_ms": round(pct(0.95), 1),
+        "p99_ms": round(pct(0.99), 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "peak_rss_mb": round(stats["peak_rss_mb"], 1),
+    }
+
+
+# -- Reporting ------------------------------------------------------------------
+
+def _print_table(rows: list[dict]):
+    cols = ["checker", "urls", "seconds", "urls_per_sec", "requests",
+            "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in cols]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(cols, widths)))
+
+
+def _regressions(rows: list[dict], baseline_path: Path, tolerance: float) -> list[str]:
+    baseline = {r["checker"]: r for r in json.loads(baseline_path.read_text())["results"]}
+    problems = []
+    for r in rows:
+        base = baseline.get(r["checker"])
+        if base and r["urls_per_sec"] < base["urls_per_sec"] * (1 - tolerance):
+            problems.append(f"{r['checker']}: {r['urls_per_sec']} URLs/sec vs. "
+                            f"{base['urls_per_sec']} in {baseline_path.name}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the link checkers against a local server.")
+    parser.add_argument("--files", type=int, default=1000, help="Files in the synthetic tree (default: 1000).")
+    parser.add_argument("--links", type=int, default=3000, help="Distinct URLs (default: 3000).")
+    parser.add_argument("--links-per-file", type=int, default=8,
+                        help="Links per file, repeats included (default: 8).")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX),
+                        help=f"Response mix as kind=weight pairs (default: {DEFAULT_MIX}).")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mean response delay (default: 20).")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Delay jitter, +/- (default: 10).")
+    parser.add_argument("--redirect-hops", type=int, default=3, help="Length of redirect chains (default: 3).")
+    parser.add_argument("--retry-after", type=int, default=0,
+                        help="Retry-After seconds sent with 429s (default: 0).")
+    parser.add_argument("--hosts", type=int, default=4, help="Loopback hosts to spread URLs over (default: 4).")
+    parser.add_argument("--repos", type=int, default=1,
+                        help="Copies of the repo for external_url_check, which all link "
+                             "the same URLs (default: 1).")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+    parser.add_argument("--only", choices=["url_check", "external_url_check"],
+                        help="Run only one of the checkers.")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to PATH.")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="Exit 1 if URLs/sec dropped more than "
+                             f"{REGRESSION_TOLERANCE * 100:.0f}%% below the results in PATH.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hosts = [f"127.0.0.{i + 1}" for i in range(args.hosts)]
+    port = _free_port()
+    server = mp.get_context("fork").Process(target=_serve, daemon=True, args=(hosts, port, {
+        "latency": args.latency_ms / 1000, "jitter": args.jitter_ms / 1000,
+        "redirect_hops": args.redirect_hops, "retry_after": args.retry_after, "seed": args.seed,
+    }))
+    server.start()
+    rows = []
+    try:
+        for host in hosts:
+            _wait_for(host, port)
+        urls = _make_urls(args.links, args.mix, hosts, port, rng)
+        slots = _spread(urls, args.files, args.links_per_file, rng)
+
+        with tempfile.TemporaryDirectory(prefix="link-bench-") as tmp:
+            doc_root = Path(tmp) / "docs"
+            repo_roots = [Path(tmp) / f"Lean.Brokerages.Bench{i}" for i in range(args.repos)]
+            _write_doc_tree(doc_root, slots)
+            for repo_root in repo_roots:
+                _write_repo(repo_root, slots)
+            print(f"Synthetic tree: {args.files} files, {len(urls)} URLs, "
+                  f"{sum(map(len, slots))} links; server on {len(hosts)} host(s), port {port}.")
+
+            if args.only in (None, "url_check"):
+                print("Running url_check ...", flush=True)
+                rows.append(_measure("url_check", _run_url_check, (doc_root,), len(urls)))
+            if args.only in (None, "external_url_check"):
+                print("Running external_url_check ...", flush=True)
+                rows.append(_measure("external_url_check", _run_external_url_check,
+                                     (repo_roots, doc_root), len(urls)))
+    finally:
+        server.terminate()
+        server.join()
+
+    print()
+    _print_table(rows)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": {
+            k: v for k, v in vars(args).items() if k not in ("json", "compare", "mix")
+        } | {"mix": dict(args.mix)}, "results": rows}, indent=2))
+        print(f"\nWrote {args.json}")
+
+    if args.compare:
+        problems = _regressions(rows, Path(args.compare), REGRESSION_TOLERANCE)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
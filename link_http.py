@@ -0,0 +1,212 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Shared HTTP scheduling, used by both url_check.py and external_url_check.py.
+#
+# A single global semaphore lets every in-flight request pile onto one host (most
+# doc links point at quantconnect.com) while other hosts sit idle, which gets us
+# rate-limited by our own docs host. HostScheduler gives each host its own
+# adaptive concurrency limit instead, AIMD-style:
+#   - every successful response raises the host's limit by 1/limit (about +1 per
+#     window of requests), up to HOST_MAX_CONCURRENCY,
+#   - a 429/503 halves it and pauses the host for its Retry-After (or an
+#     exponential backoff), after which the request is retried.
+# A global cap still bounds the total number of in-flight requests, and a host
+# slot is taken before a global one so a paused host never holds global slots.
+#
+# Most checks only need a status code and the final (redirected) URL, so probe()
+# sends a HEAD (or a one-byte ranged GET) instead of downloading the page. Checks
+# that do need the body use fetch() and stream only as much of it as they need.
+
+import asyncio
+import contextlib
+import email.utils
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+HOST_CONCURRENCY = 8        # initial simultaneous requests per host
+HOST_MAX_CONCURRENCY = 20   # ceiling the per-host limit can grow to
+KEEPALIVE_TIMEOUT = 30      # seconds an idle pooled connection is kept open
+MAX_RETRIES = 3             # retries of a throttled (429/503) request
+MAX_BACKOFF = 60            # seconds; cap on Retry-After and exponential backoff
+THROTTLE_STATUSES = {429, 503}
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    """Parse a Retry-After header (delta-seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    """The adaptive concurrency window of one host."""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttles = 0          # consecutive throttled responses
+        self.cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                try:
+                    await asyncio.wait_for(self.cond.wait(), timeout=wait if wait > 0 else None)
+                except TimeoutError:
+                    pass
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify()
+
+
+class HostScheduler:
+    """Per-host adaptive concurrency limits under a global cap."""
+
+    def __init__(self, concurrency: int, host_concurrency: int = HOST_CONCURRENCY,
+                 host_max_concurrency: int = HOST_MAX_CONCURRENCY):
+        self._global = asyncio.Semaphore(concurrency)
+        self._host_concurrency = host_concurrency
+        self._host_max_concurrency = host_max_concurrency
+        self._hosts: dict[str, _HostState] = {}
+
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self._host_concurrency)
+        return self._hosts[host]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        """Hold one request slot for the URL's host (and one global slot)."""
+        host = self._host(url)
+        await host.acquire()
+        try:
+            async with self._global:
+                yield
+        finally:
+            await host.release()
+
+    async def feedback(self, url: str, status: int, retry_after: str | None = None) -> bool:
+        """Adapt the host's limit to a response. Returns True if it was throttled."""
+        host = self._host(url)
+        async with host.cond:
+            if status in THROTTLE_STATUSES:
+                now = time.monotonic()
+                # The requests in flight when the host pushed back get throttled
+                # too; back off once per pause, not once per response.
+                if now >= host.paused_until:
+                    host.throttles += 1
+                    host.limit = max(1.0, host.limit / 2)
+                delay = _retry_after_seconds(retry_after)
+                if delay is None:
+                    delay = 2 ** host.throttles
+                host.paused_until = max(host.paused_until, now + min(delay, MAX_BACKOFF))
+                return True
+            host.throttles = 0
+            host.limit = min(self._host_max_concurrency, host.limit + 1 / host.limit)
+            host.cond.notify_all()
+            return False
+
+
+def make_connector(concurrency: int) -> aiohttp.TCPConnector:
+    """A keep-alive connection pool sized to the scheduler's limits."""
+    return aiohttp.TCPConnector(limit=concurrency, limit_per_host=HOST_MAX_CONCURRENCY,
+                                keepalive_timeout=KEEPALIVE_TIMEOUT)
+
+
+async def _send(scheduler: HostScheduler, session: aiohttp.ClientSession, method: str,
+                url: str, handle, headers: dict[str, str] | None, timeout: float):
+    """Send one request through the scheduler, retrying throttled responses."""
+    for attempt in range(MAX_RETRIES + 1):
+        async with scheduler.slot(url):
+            # trace_request_ctx lets a TraceConfig (link_metrics.py) attribute the
+            # request to the checked URL, and count throttle retries.
+            async with session.request(method, url, headers=headers, allow_redirects=True,
+                                       timeout=aiohttp.ClientTimeout(total=timeout),
+                                       trace_request_ctx={"url": url, "attempt": attempt}) as resp:
+                throttled = await scheduler.feedback(url, resp.status,
+                                                     resp.headers.get("Retry-After"))
+                if not throttled or attempt == MAX_RETRIES:
+                    return await handle(resp)
+
+
+async def fetch(scheduler: HostScheduler, session: aiohttp.ClientSession, url: str,
+                handle, headers: dict[str, str] | None = None, timeout: float = 60):
+    """GET a URL through the scheduler and return `await handle(resp, status)`.
+
+    Throttled responses (429/503) are retried after the host's backoff, up to
+    MAX_RETRIES times; the last response is handed to `handle` regardless.
+    The body is left unread, so `handle` can stream only as much as it needs.
+    Request errors propagate to the caller.
+    """
+    async def on_response(resp: aiohttp.ClientResponse):
+        return await handle(resp, resp.status)
+
+    return await _send(scheduler, session, "GET", url, on_response, headers, timeout)
+
+
+# Hosts that answered a HEAD with 405/501; they go straight to the ranged GET.
+_NO_HEAD_HOSTS: set[str] = set()
+_HEAD_UNSUPPORTED = {405, 501}
+_FALLBACK = object()
+
+
+async def probe(scheduler: HostScheduler, session: aiohttp.ClientSession, url: str,
+                handle, headers: dict[str, str] | None = None, timeout: float = 60):
+    """Like fetch(), for checks that only need the status code and final URL.
+
+    Sends a HEAD first. An error status from HEAD isn't trusted (plenty of servers
+    mishandle it), so it's confirmed with a one-byte `Range: bytes=0-0` GET, whose
+    206 Partial Content is reported to `handle` as 200. A server that can't satisfy
+    the range (416) gets a plain GET.
+    """
+    host = urlsplit(url).netloc.lower()
+    if host not in _NO_HEAD_HOSTS:
+        async def on_head(resp: aiohttp.ClientResponse):
+            if resp.status < 400:
+                return await handle(resp, resp.status)
+            if resp.status in _HEAD_UNSUPPORTED:
+                _NO_HEAD_HOSTS.add(host)
+            return _FALLBACK
+
+        result = await _send(scheduler, session, "HEAD", url, on_head, headers, timeout)
+        if result is not _FALLBACK:
+            return result
+
+    async def on_range(resp: aiohttp.ClientResponse):
+        if resp.status == 416:
+            return _FALLBACK
+        return await handle(resp, 200 if resp.status == 206 else resp.status)
+
+    result = await _send(scheduler, session, "GET", url, on_range,
+                         {**(headers or {}), "Range": "bytes=0-0"}, timeout)
+    if result is not _FALLBACK:
+        return result
+    return await fetch(scheduler, session, url, handle, headers, timeout)
@@ -0,0 +1,201 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Machine-readable run output for url_check.py and external_url_check.py
+# (--json / --junit), for dashboards that track link-check speed and flakiness.
+#
+# LinkMetrics collects:
+#   - per URL check: its finding categories, total wall time (including time queued
+#     in the scheduler), and every HTTP request it sent - method, status, throttle
+#     retry attempt, and DNS / connect / time-to-first-byte timings, taken from an
+#     aiohttp TraceConfig (DNS and connect are null when a pooled connection or
+#     cached address was reused),
+#   - per phase (scan, http, anchors, report, ...): wall time. Scanning and HTTP
+#     checks are pipelined, so their spans can overlap.
+#
+# The JSON report also totals the check time per host, so the hosts that dominate
+# a run stand out. The JUnit report has one testcase per URL; error-severity
+# categories are failures, warnings go to the testcase's system-out.
+
+import contextlib
+import json
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+class LinkMetrics:
+    """Timings and categories of one link-checker run."""
+
+    def __init__(self, checker: str):
+        self.checker = checker
+        self.started = time.time()
+        self.phases: dict[str, float] = {}
+        self.checks: dict[str, dict] = {}
+        self._requests: dict[str, list[dict]] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Add the wall time of the with-block to a phase (phases can be re-entered)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """A TraceConfig recording the timings of each request sent through link_http."""
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+            ctx.dns = ctx.connect = None
+
+        async def on_dns_start(session, ctx, params):
+            ctx.dns_start = time.perf_counter()
+
+        async def on_dns_end(session, ctx, params):
+            ctx.dns = time.perf_counter() - ctx.dns_start
+
+        async def on_connect_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connect_end(session, ctx, params):
+            ctx.connect = time.perf_counter() - ctx.connect_start
+
+        async def on_request_end(session, ctx, params):
+            self._add_request(ctx, params.method, str(params.url), params.response.status)
+
+        async def on_request_exception(session, ctx, params):
+            self._add_request(ctx, params.method, str(params.url), None)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connect_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    def _add_request(self, ctx, method: str, request_url: str, status: int | None):
+        # link_http passes the checked URL and the throttle-retry attempt along.
+        info = ctx.trace_request_ctx or {}
+        self._requests.setdefault(info.get("url", request_url), []).append({
+            "method": method,
+            "status": status,
+            "attempt": info.get("attempt", 0),
+            "dns_ms": _ms(ctx.dns),
+            "connect_ms": _ms(ctx.connect),
+            "ttfb_ms": _ms(time.perf_counter() - ctx.start),
+        })
+
+    def record(self, url: str, categories: list[str], seconds: float | None):
+        """Record the outcome of one URL check (seconds is None for checks without HTTP)."""
+        check = self.checks.setdefault(url, {"categories": [], "seconds": None})
+        check["categories"] += [c for c in categories if c not in check["categories"]]
+        if seconds is not None:
+            check["seconds"] = seconds
+
+    def _url_entries(self) -> list[dict]:
+        entries = []
+        for url, check in sorted(self.checks.items()):
+            requests = self._requests.get(url, [])
+            entries.append({
+                "url": url,
+                "host": urlsplit(url).netloc.lower(),
+                "categories": check["categories"],
+                "total_ms": _ms(check["seconds"]),
+                "retries": sum(1 for r in requests if r["attempt"] > 0),
+                "requests": requests,
+            })
+        return entries
+
+    def write_json(self, path: Path, severity: dict[str, str], counts: dict[str, int]):
+        """Write the JSON report. counts are the run's findings per category, as
+        printed on the console."""
+        entries = self._url_entries()
+        hosts: dict[str, list[float]] = {}
+        for e in entries:
+            if e["total_ms"] is not None:
+                hosts.setdefault(e["host"], []).append(e["total_ms"])
+        totals = [e["total_ms"] for e in entries if e["total_ms"] is not None]
+
+        report = {
+            "checker": self.checker,
+            "started": self.started,
+            "phases_ms": {name: _ms(seconds) for name, seconds in self.phases.items()},
+            "summary": {
+                "urls": len(entries),
+                "requests": sum(len(e["requests"]) for e in entries),
+                "retries": sum(e["retries"] for e in entries),
+                "errors": sum(n for c, n in counts.items() if severity.get(c) == "error"),
+                "warnings": sum(n for c, n in counts.items() if severity.get(c) != "error"),
+                "p50_ms": _percentile(totals, 0.50),
+                "p95_ms": _percentile(totals, 0.95),
+                "p99_ms": _percentile(totals, 0.99),
+            },
+            "categories": counts,
+            # Hosts by total check time, slowest first.
+            "hosts": sorted(({"host": host, "urls": len(ms), "total_ms": round(sum(ms), 1),
+                              "p95_ms": _percentile(ms, 0.95)} for host, ms in hosts.items()),
+                            key=lambda h: h["total_ms"], reverse=True),
+            "urls": entries,
+        }
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote JSON report to {path}")
+
+    def write_junit(self, path: Path, severity: dict[str, str]):
+        """Write the JUnit XML report, one testcase per checked URL."""
+        entries = self._url_entries()
+        elapsed = sum(self.phases.values()) if self.phases else time.time() - self.started
+        root = ET.Element("testsuites", name=self.checker)
+        suite = ET.SubElement(root, "testsuite", name=self.checker, tests=str(len(entries)),
+                              time=f"{elapsed:.3f}")
+        properties = ET.SubElement(suite, "properties")
+        for name, seconds in self.phases.items():
+            ET.SubElement(properties, "property", name=f"phase.{name}.ms", value=str(_ms(seconds)))
+
+        failures = 0
+        for e in entries:
+            case = ET.SubElement(suite, "testcase", classname=e["host"] or self.checker,
+                                 name=e["url"], time=f"{(e['total_ms'] or 0) / 1000:.3f}")
+            errors = [c for c in e["categories"] if severity.get(c) == "error"]
+            warnings = [c for c in e["categories"] if severity.get(c) != "error"]
+            if errors:
+                failures += 1
+                ET.SubElement(case, "failure", message=", ".join(errors), type=errors[0])
+            if warnings or e["retries"]:
+                out = ET.SubElement(case, "system-out")
+                out.text = "\n".join([f"warning: {c}" for c in warnings]
+                                     + ([f"retries: {e['retries']}"] if e["retries"] else []))
+        suite.set("failures", str(failures))
+
+        tree = ET.ElementTree(root)
+        ET.indent(tree)
+        tree.write(path, encoding="utf-8", xml_declaration=True)
+        print(f"Wrote JUnit report to {path}")
@@ -2,6 +2,8 @@ import os
 import re
 from pathlib import Path
 
+from doc_index import list_doc_files
+
 def find_namespace_end(content, start_index):
     """Find the index of the closing brace that matches the namespace's opening brace."""
     brace_count = 0
@@ -77,9 +79,8 @@ def find_and_process_files(directory):
     dir_path = Path(directory)
     
     # Recursively find all .html and .php files
-    for file_path in dir_path.rglob('*'):
-        if file_path.suffix.lower() in ('.html', '.php'):
-            process_file(file_path)
+    for file_path in list_doc_files(dir_path, '.html', '.php'):
+        process_file(file_path)
 
 if __name__ == "__main__":
     find_and_process_files(Path.cwd())
\ No newline at end of file
@@ -0,0 +1,107 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Adaptive status polling for QuantConnect API jobs (compiles, backtests, logs),
+# shared by examples-check/ and project-templates/run_project_match_check.py.
+#
+# Polling at a fixed interval makes short jobs wait for the next tick and spends
+# API calls (100/minute per user) re-reading long ones. A Poller instead:
+#   - reads the job's state right away (it may be done already),
+#   - then waits delays that grow exponentially from `initial` up to `maximum`,
+#   - or, when it can estimate the time left, waits about that long: from the
+#     job's reported progress (backtests report 0-1), or else from how long the
+#     previous jobs of the same kind took,
+#   - and sleeps a random 50-100% of each delay, so workers that started together
+#     don't keep hitting the API in the same second.
+#
+#   poller = Poller(initial=2, maximum=30, timeout=3600)
+#   backtest = poller.poll(read_backtest, lambda bt: bt["completed"],
+#                          progress=lambda bt: bt["progress"])
+#
+# A Poller is thread-safe; share one per kind of job so it learns their durations.
+
+import random
+import threading
+import time
+from typing import Any, Callable
+
+BACKOFF_FACTOR = 1.6     # growth of the delay between reads without an estimate
+TYPICAL_WEIGHT = 0.3     # weight of the latest job in the typical-duration average
+
+
+class Poller:
+    """Polls a job's state until it's done, with adaptive delays."""
+
+    def __init__(self, initial: float, maximum: float, timeout: float):
+        self.initial = initial
+        self.maximum = maximum
+        self.timeout = timeout
+        self._typical: float | None = None   # moving average of job durations
+        self._lock = threading.Lock()
+
+    def poll(self, read: Callable[[], Any], is_done: Callable[[Any], Any],
+             progress: Callable[[Any], float | None] | None = None) -> Any:
+        """Call read() until is_done(result) is truthy, and return that result.
+
+        progress(result), if given, returns the job's completion (0-1) or None.
+        Returns None if the job isn't done within the timeout.
+        """
+        start = time.monotonic()
+        backoff = self.initial
+        waited = False
+        while True:
+            result = read()
+            elapsed = time.monotonic() - start
+            if is_done(result):
+                # A job that was done at the first read says nothing about durations.
+                if waited:
+                    self._learn(elapsed)
+                return result
+            if elapsed >= self.timeout:
+                return None
+
+            estimate = self._time_left(elapsed, progress(result) if progress else None)
+            if estimate is None:
+                delay = backoff
+                backoff = min(self.maximum, backoff * BACKOFF_FACTOR)
+            else:
+                delay = min(self.maximum, max(self.initial, estimate))
+            time.sleep(min(random.uniform(delay / 2, delay), self.timeout - elapsed))
+            waited = True
+
+    # Pollers travel to worker processes with the objects that own them (e.g. the
+    # examples-check APIClient); each process gets its own lock.
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _time_left(self, elapsed: float, progress: float | None) -> float | None:
+        if progress is not None and 0 < progress < 1:
+            return elapsed * (1 - progress) / progress
+        with self._lock:
+            typical = self._typical
+        if typical is not None and typical > elapsed:
+            return typical - elapsed
+        return None
+
+    def _learn(self, duration: float):
+        with self._lock:
+            if self._typical is None:
+                self._typical = duration
+            else:
+                self._typical += TYPICAL_WEIGHT * (duration - self._typical)
@@ -15,6 +15,8 @@ lock: LockType | None = None
 start_time = time.time()
 
 LOG_PATH = Path(__file__).resolve().parent / "syntax-check.log"
+# Templates are type checked in this many mypy processes, in parallel
+SHARDS = 4
 
 
 def init_pool(l: LockType) -> None:
@@ -38,15 +40,20 @@ for subdir, dirs, files_in_folder in os.walk("./project-templates/python"):
             target_files.append(file_path)
 target_files.sort()
 
-def adjust_file_contents(target_file: str) -> tempfile._TemporaryFileWrapper[bytes] | None:
+# Lines added above each template's code by adjust_file_contents
+HEADER_LINES = 1
+
+# Write the template as its own module in module_dir, named after its path so every module name is unique
+def adjust_file_contents(target_file: str, module_dir: str) -> Path | None:
     try:
         file = Path(target_file)
         file_content = file.read_text(encoding='utf-8')
         adjusted_import = 'from AlgorithmImports import *;from datetime import date, time, datetime, timedelta;import pandas as pd;import numpy as np;import math;import json;import os;'
 
-        tmp_file = tempfile.NamedTemporaryFile(prefix=f"{file.name}_", delete=False)
-        Path(tmp_file.name).write_text("# mypy: disable-error-code=\"no-redef\"\n" + file_content.replace("from AlgorithmImports import *", adjusted_import), encoding='utf-8')
-        return tmp_file
+        module_name = re.sub(r'\W', '_', str(file.relative_to("./project-templates/python").with_suffix("")))
+        module = Path(module_dir) / f"template_{module_name}.py"
+        module.write_text("# mypy: disable-error-code=\"no-redef\"\n" + file_content.replace("from AlgorithmImports import *", adjusted_import), encoding='utf-8')
+        return module
     except:
         import traceback
         sync_log(f"{target_file} failed An exception occurred: {traceback.format_exc()}")
@@ -114,48 +121,67 @@ def should_ignore(line: str, prev_line_ignored: bool) -> bool:
     return False
 
 
-def run_syntax_check(target_file: str) -> bool:
-    tmp_file = adjust_file_contents(target_file)
-    if not tmp_file:
-        return False
-
-    try:
-        algorithm_result = run([sys.executable, "-m", "mypy", "--strict", "--skip-cache-mtime-checks", "--skip-version-check", "--show-error-codes",
-            "--no-error-summary", "--no-color-output", "--ignore-missing-imports", "--check-untyped-defs",  tmp_file.name], capture_output=True, text=True)
-
-        output = ''
-        if algorithm_result.stderr:
-            output += algorithm_result.stderr
-        if algorithm_result.stdout:
-            output += algorithm_result.stdout
-
-        filtered_output = ''
-        prev_line_ignored = False
-        for line in output.splitlines():
-            ignored = not line.startswith(tmp_file.name) or should_ignore(line, prev_line_ignored)
-            if not ignored:
-                filtered_output += f"{line}\n"
-            prev_line_ignored = ignored
-
-        if filtered_output:
-            sync_log(f"{target_file}\n{filtered_output}")
-            return False
-        return True
-    except:
-        import traceback
-        sync_log(f"{target_file} failed An exception occurred: {traceback.format_exc()}")
-    finally:
-        tmp_file.close()
-        os.unlink(tmp_file.name)
-    return False
+# Type check a shard of templates with one mypy run, so the QuantConnect stubs are loaded once per shard
+def run_syntax_check(shard: list[str]) -> list[bool]:
+    with tempfile.TemporaryDirectory() as module_dir:
+        modules = {}
+        for target_file in shard:
+            module = adjust_file_contents(target_file, module_dir)
+            if module:
+                modules[str(module)] = target_file
+        if not modules:
+            return [False] * len(shard)
+
+        try:
+            algorithm_result = run([sys.executable, "-m", "mypy", "--strict", "--skip-cache-mtime-checks", "--skip-version-check", "--show-error-codes",
+                "--no-error-summary", "--no-color-output", "--ignore-missing-imports", "--check-untyped-defs", *modules], capture_output=True, text=True)
+
+            output = ''
+            if algorithm_result.stderr:
+                output += algorithm_result.stderr
+            if algorithm_result.stdout:
+                output += algorithm_result.stdout
+
+            # Map each error back to its template and line, e.g.
+            # "/tmp/tmpabc/template_equity_aroon_trend_main.py:12: error: ..." -> "./project-templates/python/equity-aroon-trend/main.py:11: error: ..."
+            filtered_output: dict[str, str] = {target_file: '' for target_file in modules.values()}
+            # Errors outside the templates' modules, e.g. in the stubs
+            unmapped_output = ''
+            prev_line_ignored = False
+            for line in output.splitlines():
+                module, _, rest = line.partition(':')
+                line_number, _, message = rest.partition(':')
+                ignored = should_ignore(line, prev_line_ignored)
+                if not ignored:
+                    if module in modules and line_number.isdigit():
+                        filtered_output[modules[module]] += f"{modules[module]}:{int(line_number) - HEADER_LINES}:{message}\n"
+                    elif ': error: ' in line:
+                        unmapped_output += line + '\n'
+                prev_line_ignored = ignored
+
+            for target_file, errors in filtered_output.items():
+                if errors:
+                    sync_log(f"{target_file}\n{errors}")
+            # They can't be pinned on one template, so the whole shard fails
+            if unmapped_output:
+                sync_log(f"{shard} failed with errors outside the templates:\n{unmapped_output}")
+                return [False] * len(shard)
+            return [target_file in filtered_output and not filtered_output[target_file] for target_file in shard]
+        except:
+            import traceback
+            sync_log(f"{shard} failed An exception occurred: {traceback.format_exc()}")
+    return [False] * len(shard)
 
 if __name__ == '__main__':
     freeze_support()
 
-    with Pool(4, initializer=init_pool, initargs=(Lock(),)) as pool:
+    with Pool(SHARDS, initializer=init_pool, initargs=(Lock(),)) as pool:
         if len(sys.argv) > 1:
             target_files = [target for target in target_files if sys.argv[1] in target]
-        result = pool.map(run_syntax_check, target_files)
+        # One mypy process per shard instead of per template
+        shards = [target_files[i::SHARDS] for i in range(SHARDS)]
+        results = dict(zip(sum(shards, []), sum(pool.map(run_syntax_check, shards), [])))
+        result = [results[target] for target in target_files]
         log(f"TEMPLATES: {target_files}")
         log(str(result))
         success_rate = round((sum(result) / len(result)) * 100, 1)
@@ -22,6 +22,8 @@ local runs, from ``~/.lean/credentials``:
     DOCS_TEMPLATE_ORG_ID        <- organization-id  (optional in env, required
                                                      so new projects land in the
                                                      documentation org)
+    DOCS_TEMPLATE_API_URL       <- API base URL (optional; e.g. a local
+                                   examples-check/mock_api_server.py)
 
 Usage:
     python run_project_match_check.py                 # check every template
@@ -43,6 +45,9 @@ from typing import Any, NamedTuple, cast
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from poller import Poller  # noqa: E402
+
 
 def _load_credentials() -> tuple[str, str, str | None]:
     user_id = os.environ.get("DOCS_TEMPLATE_USER_ID")
@@ -66,15 +71,15 @@ def _load_credentials() -> tuple[str, str, str | None]:
 
 
 USER_ID, USER_TOKEN, ORG_ID = _load_credentials()
-BASE_URL = "https://www.quantconnect.com/api/v2"
+BASE_URL = os.environ.get("DOCS_TEMPLATE_API_URL", "https://www.quantconnect.com/api/v2")
 COLLABORATOR_USER_IDS = ["alexandre_catarino"]
 
 WORKERS_PER_LANG = 1
 RETRY_ATTEMPTS = 5
-COMPILE_POLL_SEC = 2
-COMPILE_MAX_ATTEMPTS = 90          # ~3 minutes
-BACKTEST_POLL_SEC = 10
-BACKTEST_MAX_ATTEMPTS = 360        # ~1 hour
+# Status polls back off between these delays (see poller.py); shared by the
+# worker threads, so they learn how long compiles and backtests take.
+COMPILE_POLLER = Poller(initial=1, maximum=10, timeout=180)
+BACKTEST_POLLER = Poller(initial=2, maximum=30, timeout=3600)
 REQUEST_TIMEOUT_SEC = 60
 
 SKIP_BACKTEST = False  # set by --no-backtest in main()
@@ -186,15 +191,15 @@ def read_file(project_id: int, filename: str) -> str | None:
 def compile_project(project_id: int) -> str:
     body = _post("/compile/create", {"projectId": project_id})
     compile_id = body["compileId"]
-    for _ in range(COMPILE_MAX_ATTEMPTS):
-        body = _post("/compile/read", {"projectId": project_id, "compileId": compile_id})
-        state = body.get("state")
-        if state == "BuildSuccess":
-            return cast(str, compile_id)
-        if state == "BuildError":
-            raise RuntimeError(f"compile failed: {body.get('logs')}")
-        time.sleep(COMPILE_POLL_SEC)
-    raise RuntimeError("compile timed out")
+    body = COMPILE_POLLER.poll(
+        lambda: _post("/compile/read", {"projectId": project_id, "compileId": compile_id}),
+        lambda body: body.get("state") in ("BuildSuccess", "BuildError"),
+    )
+    if body is None:
+        raise RuntimeError("compile timed out")
+    if body["state"] == "BuildError":
+        raise RuntimeError(f"compile failed: {body.get('logs')}")
+    return cast(str, compile_id)
 
 
 def run_backtest(project_id: int, compile_id: str, name: str) -> dict[str, Any]:
@@ -207,15 +212,15 @@ def run_backtest(project_id: int, compile_id: str, name: str) -> dict[str, Any]:
         bt = bt[0]
     backtest_id = bt["backtestId"]
 
-    for _ in range(BACKTEST_MAX_ATTEMPTS):
+    def read() -> dict[str, Any]:
         body = _post("/backtests/read", {"projectId": project_id, "backtestId": backtest_id})
         bt = body["backtest"]
-        if isinstance(bt, list):
-            bt = bt[0]
-        if bt.get("completed"):
-            return cast(dict[str, Any], bt)
-        time.sleep(BACKTEST_POLL_SEC)
-    raise RuntimeError("backtest timed out")
+        return cast(dict[str, Any], bt[0] if isinstance(bt, list) else bt)
+
+    bt = BACKTEST_POLLER.poll(read, lambda bt: bt.get("completed"), lambda bt: bt.get("progress"))
+    if bt is None:
+        raise RuntimeError("backtest timed out")
+    return cast(dict[str, Any], bt)
 
 
 def validate_backtest(bt: dict[str, Any]) -> str | None:
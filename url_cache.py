@@ -0,0 +1,140 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Persistent on-disk cache of HTTP verdicts (and GitHub issue states) for url_check.py.
+#
+# Most external links don't change between two nightly runs, so re-GETting all of
+# them every time is wasted wall time and outbound traffic. This module keeps one
+# verdict per normalized URL in a SQLite file:
+#   - status, final (redirected) URL and soft-404 flag of the last response,
+#   - the ETag / Last-Modified validators the server sent with it,
+#   - body-derived facts the checker needed (e.g. a GitHub issue's state),
+#   - the time it was checked.
+#
+# A verdict younger than the TTL is reused without touching the network; an error
+# verdict (4xx/5xx or soft 404) only for ERROR_TTL, so a fixed link or a server's
+# transient failure doesn't linger as broken for a whole day. An older one is
+# revalidated with a conditional request (If-None-Match/If-Modified-Since);
+# a 304 Not Modified reply refreshes its timestamp instead of re-downloading.
+#
+# The states of referenced Lean issues are kept in a second table, since they're
+# resolved in batches over GraphQL rather than URL by URL.
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_TTL = 24 * 60 * 60   # seconds a verdict is trusted without revalidation
+ERROR_TTL = 60 * 60          # same, for error verdicts (capped by the cache's TTL)
+
+
+class Verdict(NamedTuple):
+    """The outcome of one HTTP check of a URL."""
+    status: int
+    final_url: str
+    soft_404: bool
+    etag: str = ""
+    last_modified: str = ""
+    details: dict | None = None   # body-derived facts, e.g. {"issue_state": "closed"}
+    checked_at: float = 0.0
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: lowercase scheme/host, no fragment.
+
+    The fragment is never sent to the server, so "page#a" and "page#b" share one
+    HTTP verdict (their anchors are validated separately, on disk).
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path or "/", parts.query, ""))
+
+
+def conditional_headers(verdict: Verdict) -> dict[str, str]:
+    """Request headers that let the server answer 304 if the page hasn't changed."""
+    headers = {}
+    if verdict.etag:
+        headers["If-None-Match"] = verdict.etag
+    if verdict.last_modified:
+        headers["If-Modified-Since"] = verdict.last_modified
+    return headers
+
+
+class UrlCache:
+    """SQLite-backed store of Verdicts keyed by normalized URL."""
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL):
+        self._ttl = ttl
+        self._db = sqlite3.connect(str(path))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " url TEXT PRIMARY KEY, status INTEGER, final_url TEXT, soft_404 INTEGER,"
+            " etag TEXT, last_modified TEXT, details TEXT, checked_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS github_issues ("
+            " number INTEGER PRIMARY KEY, state TEXT, checked_at REAL)"
+        )
+
+    def get(self, url: str) -> Verdict | None:
+        row = self._db.execute(
+            "SELECT status, final_url, soft_404, etag, last_modified, details, checked_at"
+            " FROM verdicts WHERE url = ?", (normalize_url(url),)
+        ).fetchone()
+        if not row:
+            return None
+        status, final_url, soft_404, etag, last_modified, details, checked_at = row
+        return Verdict(status, final_url, bool(soft_404), etag, last_modified,
+                       json.loads(details), checked_at)
+
+    def is_fresh(self, verdict: Verdict) -> bool:
+        ttl = self._ttl
+        if verdict.status >= 400 or verdict.soft_404:
+            ttl = min(ttl, ERROR_TTL)
+        return time.time() - verdict.checked_at < ttl
+
+    def put(self, url: str, verdict: Verdict):
+        self._db.execute(
+            "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (normalize_url(url), verdict.status, verdict.final_url, int(verdict.soft_404),
+             verdict.etag, verdict.last_modified, json.dumps(verdict.details or {}),
+             verdict.checked_at or time.time()),
+        )
+
+    def touch(self, url: str) -> Verdict | None:
+        """Mark a cached verdict as just revalidated (the server answered 304)."""
+        self._db.execute("UPDATE verdicts SET checked_at = ? WHERE url = ?",
+                         (time.time(), normalize_url(url)))
+        return self.get(url)
+
+    def get_issue_states(self, numbers: set[int]) -> dict[int, str | None]:
+        """Fresh cached states of Lean GitHub issues; None means the issue doesn't exist."""
+        states = {}
+        cutoff = time.time() - self._ttl
+        for number, state, checked_at in self._db.execute(
+                "SELECT number, state, checked_at FROM github_issues"):
+            if number in numbers and checked_at > cutoff:
+                states[number] = state
+        return states
+
+    def put_issue_states(self, states: dict[int, str | None]):
+        now = time.time()
+        self._db.executemany("INSERT OR REPLACE INTO github_issues VALUES (?, ?, ?)",
+                             [(number, state, now) for number, state in states.items()])
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
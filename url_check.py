@@ -15,10 +15,12 @@
 #
 # Scans all .html/.php doc files and documentation-map.json for <a href="..."> links,
 # then validates them:
-#   - HTTP checks: GET each external URL, flag 4xx responses and soft-404 pages.
+#   - HTTP checks: probe each external URL (HEAD, falling back to a one-byte ranged
+#     GET), flag 4xx responses and soft-404 pages.
 #   - Section anchors: verify that #fragment links map to real files on disk.
 #   - Resource includes: verify <? include(DOCS_RESOURCES."...") targets exist.
-#   - GitHub issues: confirm referenced Lean issues are still open.
+#   - GitHub issues: confirm referenced Lean issues are still open (resolved in
+#     batched GraphQL queries when GH_TOKEN/GITHUB_TOKEN is set).
 #   - lean.io pages: confirm docs pages have content files in the GitHub tree.
 #
 # Each error category has a configurable severity ("error" or "warning") in the
@@ -32,25 +34,54 @@
 #   pip install aiohttp
 #   python url_check.py                  # local run, no GitHub issue management
 #   python url_check.py --create-issue   # CI run, creates/updates/closes GitHub issues
+#   python url_check.py --no-cache       # ignore cached verdicts, re-check every URL
+#   python url_check.py --since origin/master   # PR run, only links touched since the ref
+#   python url_check.py --json run.json --junit run.xml   # also write machine-readable
+#                                                         # reports (see link_metrics.py)
+#
+# A full run stores the links it found in .url_check_snapshot.json, along with the
+# commit it scanned (when the working tree had no changes). A --since run (the PR
+# job of url_check_workflow.yml) re-extracts links only from the files changed since
+# that commit, which must be an ancestor of the git ref, re-validates the anchors
+# that point into added/deleted/renamed section files, and patches its own copy of
+# the snapshot instead of rescanning the whole tree; the stored snapshot is left as
+# is. Since it only sees the links of the changed files, it can't manage the GitHub
+# issue (--create-issue).
+#
+# HTTP verdicts are cached in .url_check_cache.sqlite (see url_cache.py). Verdicts
+# younger than --cache-ttl hours (an hour at most for errors) skip the network; older
+# ones are revalidated with a conditional request. Throttled responses aren't cached.
+#
+# A full scan extracts links on a process pool. Each URL's HTTP check starts as soon
+# as it's first found; its findings are recorded once extraction is done and the
+# full list of files linking to it is known.
 
 import argparse
 import asyncio
+import codecs
+import contextlib
 import json
+import mmap
 import os
 import re
 import subprocess
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import aiohttp
 
-from doc_anchors import build_file_index, check_section_anchor
+from doc_anchors import anchor_stems, build_file_index, check_section_anchor, is_content_file
+from link_http import THROTTLE_STATUSES, HostScheduler, fetch, make_connector, probe
+from link_metrics import LinkMetrics
+from url_cache import DEFAULT_TTL, UrlCache, Verdict, conditional_headers
 
 # -- Constants ----------------------------------------------------------------
 BASE_PATH = Path(__file__).resolve().parent                  # repo root
 ROOT = "https://www.quantconnect.com/"
 LEAN_IO = "https://www.lean.io/"
+DOC_MAP = BASE_PATH / "documentation-map.json"
 STRATEGY_PHP = BASE_PATH / "03 Writing Algorithms" / "42 Strategy Library" / "02 Tutorials.php"
 LEAN_IO_FOLDERS = {"05 Lean CLI", "06 LEAN Engine"}
 IGNORE_FILES = {str(BASE_PATH / "Resources" / "indicators" / "using-indicator.php")}
@@ -59,7 +90,17 @@ LEAN_IO_ERROR_URLS = [
     "/docs/v2/cloud-platform", "/docs/v2/local-platform",
     "/docs/v2/writing-algorithm", "/docs/v2/research-environment",
 ]
-CONCURRENCY = 50          # simultaneous HTTP requests
+CONCURRENCY = 50          # simultaneous HTTP requests, across all hosts
+STREAM_CHUNK = 64 * 1024  # bytes read at a time when a check needs the page body
+STREAM_OVERLAP = 4096     # chars carried between chunks so a tag can't be split
+SCAN_CHUNK = 200          # doc files per process-pool extraction job
+GITHUB_GRAPHQL = "https://api.github.com/graphql"
+GRAPHQL_BATCH = 100       # issues resolved per GraphQL query
+ISSUE_API_RE = re.compile(r"api\.github\.com/repos/QuantConnect/Lean/issues/(\d+)")
+RESOURCE_INCLUDE = b'<? include(DOCS_RESOURCES."'
+LINK_RE = re.compile(rb"href|" + re.escape(RESOURCE_INCLUDE))  # both link kinds, one pass
+CACHE_FILE = BASE_PATH / ".url_check_cache.sqlite"           # persistent URL verdicts
+SNAPSHOT_FILE = BASE_PATH / ".url_check_snapshot.json"       # links found by the last full scan
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
 
 # -- Error categories ---------------------------------------------------------
@@ -96,94 +137,166 @@ def _path_to_link(filepath: str, skip_last: int = 0) -> str:
 
 # -- Walk the tree once --------------------------------------------------------
 
+def _is_doc_file(filepath: str) -> bool:
+    """Whether a content file is scanned for URLs and resource includes."""
+    return (filepath.endswith(".html") or filepath.endswith(".php")) and filepath not in IGNORE_FILES
+
+
 def _collect_files() -> tuple[list[str], dict[str, list[str]]]:
     """Build the docs file index, then derive the doc files to scan from it.
     - file_index: all content files indexed by lowercased stem (anchor lookup)
     - doc_files: the .html/.php subset, for URL/resource extraction
     """
     file_index = build_file_index(BASE_PATH)
-    doc_files = sorted(
-        fp
-        for files in file_index.values()
-        for fp in files
-        if (fp.endswith(".html") or fp.endswith(".php")) and fp not in IGNORE_FILES
-    )
+    doc_files = sorted(fp for files in file_index.values() for fp in files if _is_doc_file(fp))
     return doc_files, file_index
 
 
 # -- URL extraction -----------------------------------------------------------
 
-def _get_all_urls(doc_files: list[str]) -> dict[str, list[str]]:
-    """Extract all href URLs from doc files + documentation-map.json."""
-    url_files: dict[str, list[str]] = {}
-    modified_files: dict[str, list[str]] = {}   # filepath → new lines (only if changed)
+def _line_urls(line: str, filepath: str, url_files: dict[str, list[str]]) -> str | None:
+    """Record the href URLs of one line. Returns the rewritten line if it had relative links."""
+    href_idx = line.find("href")
+    if href_idx < 0:
+        return None
+    a_idx = line[:href_idx].find("<a")
+    if a_idx < 0:
+        return None
+    if "<?=" in line[href_idx:]:
+        return None
+    if "<!--" in line[:a_idx]:
+        return None
+
+    # Extract href values
+    converted_line = line
+    has_relative_link = False
+    reconstructed = line[:a_idx + 3] + line[href_idx:]
+    segments = reconstructed.replace("'", '"').split('a href="')[1:]
+    for seg in segments:
+        raw_url = seg.split('"')[0]
 
-    # 1) documentation-map.json
-    map_path = BASE_PATH / "documentation-map.json"
-    with open(map_path, encoding="utf-8") as f:
-        doc_map = json.load(f)
-    map_label = str(map_path)
-    for value in doc_map.values():
-        url, _, _, _ = _url_conversion(value, map_label, "")
-        url_files.setdefault(url, []).append(map_label)
+        if "{" in raw_url or "}" in raw_url or "$" in raw_url:
+            continue
 
-    # 2) All doc files
-    for filepath in doc_files:
-        try:
-            with open(filepath, encoding="utf-8", errors="replace") as f:
-                lines = f.readlines()
-        except Exception:
+        if not raw_url or raw_url.isspace():
+            url_files.setdefault("", []).append(filepath)
             continue
 
-        has_relative_link = False
-        new_lines = list(lines)
+        url, lean_io_url, is_relative, converted_line = _url_conversion(
+            raw_url, filepath, converted_line
+        )
+        if is_relative:
+            has_relative_link = True
 
-        for i, line in enumerate(lines):
-            href_idx = line.find("href")
-            if href_idx < 0:
-                continue
-            a_idx = line[:href_idx].find("<a")
-            if a_idx < 0:
-                continue
-            if "<?=" in line[href_idx:]:
-                continue
-            if "<!--" in line[:a_idx]:
-                continue
+        url_files.setdefault(url, []).append(filepath)
 
-            # Extract href values
-            reconstructed = line[:a_idx + 3] + line[href_idx:]
-            segments = reconstructed.replace("'", '"').split('a href="')[1:]
-            for seg in segments:
-                raw_url = seg.split('"')[0]
+        if lean_io_url:
+            url_files.setdefault(lean_io_url, []).append(filepath)
+
+    return converted_line if has_relative_link else None
 
-                if "{" in raw_url or "}" in raw_url or "$" in raw_url:
-                    continue
 
-                if not raw_url or raw_url.isspace():
-                    url_files.setdefault("", []).append(filepath)
+def _scan_file(filepath: str, url_files: dict[str, list[str]],
+               resource_files: dict[str, list[str]]) -> bytes | None:
+    """Extract the hrefs and <? include(DOCS_RESOURCES."...") targets of one file.
+
+    Returns the file's new content if relative links were rewritten, else None.
+    """
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            edits: list[tuple[int, int, bytes]] = []
+            line_end = 0
+            for m in LINK_RE.finditer(buf):
+                if m.group() == RESOURCE_INCLUDE:
+                    quote = buf.find(b'"', m.end())
+                    sub_dir = buf[m.end():quote if quote >= 0 else len(buf)].decode(
+                        "utf-8", errors="replace").lstrip("/")
+                    if sub_dir and not sub_dir.isspace() and "{" not in sub_dir and "}" not in sub_dir:
+                        resource_files.setdefault(sub_dir, []).append(filepath)
                     continue
+                if m.start() < line_end:
+                    continue    # this line was already parsed
+                line_start = buf.rfind(b"\n", 0, m.start()) + 1
+                line_end = buf.find(b"\n", m.end()) + 1 or len(buf)
+                raw = buf[line_start:line_end]
+                converted = _line_urls(raw.decode("utf-8", errors="replace"), filepath, url_files)
+                if converted is not None:
+                    edits.append((line_start, line_end, converted.encode("utf-8")))
+
+            if not edits:
+                return None
+            parts, pos = [], 0
+            for line_start, line_end, line in edits:
+                parts += [buf[pos:line_start], line]
+                pos = line_end
+            parts.append(buf[pos:])
+            return b"".join(parts)
+
+
+def _extract_links(doc_files: list[str], include_map: bool = True
+                   ) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """Extract all href URLs and resource includes from doc files + documentation-map.json.
+
+    Returns (url_files, resource_files). Files whose relative links were converted
+    to absolute ones are written back.
+    """
+    url_files: dict[str, list[str]] = {}
+    resource_files: dict[str, list[str]] = {}
 
-                url, lean_io_url, is_relative, converted_line = _url_conversion(
-                    raw_url, filepath, new_lines[i]
-                )
-                if is_relative:
-                    new_lines[i] = converted_line
-                    has_relative_link = True
+    # 1) documentation-map.json
+    if include_map:
+        with open(DOC_MAP, encoding="utf-8") as f:
+            doc_map = json.load(f)
+        map_label = str(DOC_MAP)
+        for value in doc_map.values():
+            url, _, _, _ = _url_conversion(value, map_label, "")
+            url_files.setdefault(url, []).append(map_label)
+
+    # 2) All doc files
+    for filepath in doc_files:
+        try:
+            new_content = _scan_file(filepath, url_files, resource_files)
+        except (OSError, ValueError):
+            continue
+        # Write back files with converted relative links
+        if new_content is not None:
+            with open(filepath, "wb") as f:
+                f.write(new_content)
 
-                url_files.setdefault(url, []).append(filepath)
+    return url_files, resource_files
 
-                if lean_io_url:
-                    url_files.setdefault(lean_io_url, []).append(filepath)
 
-        if has_relative_link:
-            modified_files[filepath] = new_lines
+def _scan_chunk(doc_files: list[str]) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """Process-pool job: the links of a slice of the doc files."""
+    return _extract_links(doc_files, include_map=False)
 
-    # Write back files with converted relative links
-    for filepath, new_lines in modified_files.items():
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
 
-    return url_files
+async def _extract_links_streaming(
+    doc_files: list[str], on_new_urls,
+) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """_extract_links, fanned out over a process pool in SCAN_CHUNK-file slices.
+
+    on_new_urls(url_files, urls) is called with each URL the first time it's found,
+    so its HTTP check can start while the rest of the tree is still being scanned.
+    Slices are merged in order, so every URL's file list ends up in the same order
+    as a serial scan - but it's only complete once this returns.
+    """
+    url_files, resource_files = _extract_links([])
+    on_new_urls(url_files, list(url_files))
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor() as pool:
+        jobs = [loop.run_in_executor(pool, _scan_chunk, doc_files[i:i + SCAN_CHUNK])
+                for i in range(0, len(doc_files), SCAN_CHUNK)]
+        for job in jobs:
+            chunk_urls, chunk_resources = await job
+            new_urls = [url for url in chunk_urls if url not in url_files]
+            _merge(url_files, chunk_urls)
+            _merge(resource_files, chunk_resources)
+            on_new_urls(url_files, new_urls)
+    return url_files, resource_files
 
 
 def _url_conversion(url: str, filepath: str, line: str) -> tuple[str, str, bool, str]:
@@ -231,80 +344,369 @@ def _get_strategy_php_urls() -> dict[str, list[str]]:
     return {str(STRATEGY_PHP): urls} if urls else {}
 
 
-def _get_resource_redirects(doc_files: list[str]) -> dict[str, list[str]]:
-    """Find all <? include(DOCS_RESOURCES."...") references."""
-    resource_files: dict[str, list[str]] = {}
+# -- Incremental (--since) mode ------------------------------------------------
 
-    for filepath in doc_files:
+def _git(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], capture_output=True, text=True, cwd=BASE_PATH)
+
+
+def _snapshot_base() -> str | None:
+    """The commit the working tree matches, or None if it has uncommitted changes."""
+    if _git("status", "--porcelain").stdout.strip():
+        return None
+    head = _git("rev-parse", "HEAD")
+    return head.stdout.strip() if head.returncode == 0 else None
+
+
+def _save_snapshot(url_files: dict[str, list[str]], resource_files: dict[str, list[str]]):
+    """Store the links found by a full scan, with the commit they were found in."""
+    with open(SNAPSHOT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"base": _snapshot_base(), "urls": url_files, "resources": resource_files}, f)
+
+
+def _load_snapshot() -> tuple[dict[str, list[str]], dict[str, list[str]], str | None] | None:
+    try:
+        with open(SNAPSHOT_FILE, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return snapshot["urls"], snapshot["resources"], snapshot.get("base")
+
+
+def _changed_files(since: str) -> dict[str, str]:
+    """Files changed between a git ref and the working tree: {abs path: A|M|D}.
+
+    A rename is reported as a delete of the old path plus an add of the new one.
+    Untracked files count as added.
+    """
+    diff = subprocess.run(
+        ["git", "diff", "--name-status", "-M", "-z", since],
+        capture_output=True, text=True, cwd=BASE_PATH, check=True,
+    ).stdout.split("\0")
+    untracked = subprocess.run(
+        ["git", "ls-files", "--others", "--exclude-standard", "-z"],
+        capture_output=True, text=True, cwd=BASE_PATH, check=True,
+    ).stdout.split("\0")
+
+    changed: dict[str, str] = {}
+    entries = iter(diff)
+    for status in entries:
+        if not status:
+            continue
+        if status[0] in "RC":
+            old, new = next(entries), next(entries)
+            if status[0] == "R":
+                changed[str(BASE_PATH / old)] = "D"
+            changed[str(BASE_PATH / new)] = "A"
+        else:
+            changed[str(BASE_PATH / next(entries))] = "D" if status[0] == "D" else status[0]
+    for path in untracked:
+        if path:
+            changed[str(BASE_PATH / path)] = "A"
+    return changed
+
+
+def _drop_files(link_files: dict[str, list[str]], stale: set[str]) -> dict[str, list[str]]:
+    """Remove the stale files from a {link: [files]} map, dropping orphaned links."""
+    kept = {}
+    for link, files in link_files.items():
+        files = [f for f in files if f not in stale]
+        if files:
+            kept[link] = files
+    return kept
+
+
+def _merge(link_files: dict[str, list[str]], update: dict[str, list[str]]):
+    for link, files in update.items():
+        link_files.setdefault(link, []).extend(files)
+
+
+def _incremental_scan(
+    since: str,
+) -> tuple[dict[str, list[str]], dict[str, list[str]], set[str], set[str]] | None:
+    """Patch the full-scan snapshot with the links of files changed since it was made.
+
+    The changes are diffed from the snapshot's commit, which must be an ancestor of
+    the `since` ref, so they include everything changed since the ref. The patched
+    snapshot is only used for this run; it's never saved.
+    Returns (url_files, resource_files, urls to check over HTTP, urls whose anchors
+    need re-validating), or None when there is no usable snapshot to patch.
+    """
+    snapshot = _load_snapshot()
+    if snapshot is None:
+        print(f"No snapshot at {SNAPSHOT_FILE.name}; running a full scan instead.")
+        return None
+    url_files, resource_files, base = snapshot
+    if base is None or _git("merge-base", "--is-ancestor", base, since).returncode != 0:
+        print(f"The snapshot at {SNAPSHOT_FILE.name} wasn't made from a commit before "
+              f"{since}; running a full scan instead.")
+        return None
+
+    changed = _changed_files(base)
+    stale = set(changed)
+    # The strategy map is a single file; always re-read it.
+    stale.add(str(STRATEGY_PHP))
+    url_files = _drop_files(url_files, stale)
+    resource_files = _drop_files(resource_files, stale)
+
+    # Only the changed files are read, so the doc files come from the change list
+    # rather than from a walk of the tree.
+    changed_docs = sorted(fp for fp, status in changed.items()
+                          if status != "D" and os.path.isfile(fp)
+                          and is_content_file(fp) and _is_doc_file(fp))
+    new_urls, new_resources = _extract_links(changed_docs, include_map=str(DOC_MAP) in changed)
+    _merge(url_files, new_urls)
+    url_files.update(_get_strategy_php_urls())
+    _merge(resource_files, new_resources)
+
+    # Links that live in a changed file get the full check. Anchors elsewhere
+    # only need re-validating if they point at an added/deleted/renamed file.
+    to_check = set(new_urls)
+    moved_stems = {Path(fp).stem.lower() for fp, status in changed.items() if status in "AD"}
+    to_anchor = {url for url in url_files
+                 if url not in to_check and anchor_stems(url) & moved_stems}
+    print(f"{len(changed)} file(s) changed since the snapshot's commit {base[:12]}: "
+          f"{len(to_check)} link(s) to check, {len(to_anchor)} anchor(s) to re-validate.")
+    return url_files, resource_files, to_check, to_anchor
+
+
+# -- GitHub issue states ------------------------------------------------------
+
+def _issue_number(url: str) -> int | None:
+    m = ISSUE_API_RE.search(url)
+    return int(m.group(1)) if m else None
+
+
+async def _resolve_issue_states(
+    session: aiohttp.ClientSession,
+    urls: list[str],
+    cache: UrlCache | None,
+) -> dict[int, str | None]:
+    """Look up the state of every referenced Lean issue in batched GraphQL queries.
+
+    Returns {issue number: "open"/"closed", or None if it doesn't exist}. Issues
+    missing from the result (no token, or a failed batch) fall back to the
+    per-URL REST check in _check_url.
+    """
+    numbers = {n for n in map(_issue_number, urls) if n is not None}
+    states = cache.get_issue_states(numbers) if cache else {}
+    pending = sorted(numbers - set(states))
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if not pending or not token:
+        return states
+
+    fetched: dict[int, str | None] = {}
+    for i in range(0, len(pending), GRAPHQL_BATCH):
+        batch = pending[i:i + GRAPHQL_BATCH]
+        fields = " ".join(
+            f"i{n}: issueOrPullRequest(number: {n}) {{ ... on Issue {{ state }} ... on PullRequest {{ state }} }}"
+            for n in batch
+        )
+        query = f'query {{ repository(owner: "QuantConnect", name: "Lean") {{ {fields} }} }}'
         try:
-            with open(filepath, encoding="utf-8", errors="replace") as f:
-                content = f.read()
+            async with session.post(GITHUB_GRAPHQL, json={"query": query},
+                                    headers={"Authorization": f"bearer {token}"},
+                                    timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                data = (await resp.json()).get("data") or {}
         except Exception:
             continue
+        repository = data.get("repository") or {}
+        for n in batch:
+            if f"i{n}" not in repository:
+                continue
+            node = repository[f"i{n}"]
+            # Match the REST issues API: a merged pull request is "closed".
+            fetched[n] = None if node is None else {"OPEN": "open"}.get(node["state"], "closed")
 
-            parts = content.split('<? include(DOCS_RESOURCES."')
-            for part in parts[1:]:
-                sub_dir = part.split('"')[0]
-                if sub_dir.startswith("/"):
-                    sub_dir = sub_dir[1:]
-                if not sub_dir or sub_dir.isspace() or "{" in sub_dir or "}" in sub_dir:
-                    continue
-                # skip if line is commented out
-                line_start = part.rsplit("\n", 1)[-1] if "\n" in content.split('<? include(DOCS_RESOURCES."')[0] else ""
-                resource_files.setdefault(sub_dir, []).append(filepath)
-
-    return resource_files
+    if cache:
+        cache.put_issue_states(fetched)
+    print(f"Resolved {len(states) + len(fetched)}/{len(numbers)} GitHub issue states "
+          f"({len(fetched)} via GraphQL).")
+    return states | fetched
 
 
 # -- HTTP checking ------------------------------------------------------------
 
+def _is_lean_io_docs_page(url: str) -> bool:
+    return ("lean.io" in url and "/docs/v2" in url and "api-reference" not in url
+            and "#" not in url)
+
+
+def _needs_docs_page_check(url: str, files: list[str]) -> bool:
+    """lean.io docs links referenced only from Resources must point at a real docs page."""
+    return (_is_lean_io_docs_page(url)
+            and all("Resources" in f.replace("\\", "/") for f in files))
+
+
 async def _check_200_response(
     resp: aiohttp.ClientResponse,
     url: str,
     files: list[str],
     is_github_issue: bool,
-    results: dict[str, list[str]],
-):
-    """Handle additional checks when a URL returns 200 OK."""
+) -> dict:
+    """Collect the body-derived facts needed when a URL returns 200 OK."""
+    details = {}
     if is_github_issue:
         body = await resp.text()
         try:
-            state = json.loads(body).get("state")
-            if state != "open":
-                results["github_issue_closed"].append(
-                    _fmt(f"GitHub issue is not open (state: {state})", url, files))
+            details["issue_state"] = json.loads(body).get("state")
         except json.JSONDecodeError:
             pass
 
-    # Check for soft-404 (redirected to /404 page)
-    if str(resp.url).rstrip("/").endswith("/404"):
-        results["soft_404"].append(_fmt("Soft 404 (page not found)", url, files))
-
     # lean.io resource-only links: check GitHub folder
-    if "lean.io" in url and "/docs/v2" in url and "api-reference" not in url:
-        if "#" not in url and all("Resources" in f.replace("\\", "/") for f in files):
-            body = await resp.text()
-            if not _check_github_folder_in_html(body):
-                results["invalid_docs_page"].append(
-                    _fmt("Not a valid docs page", url, files))
+    if _needs_docs_page_check(url, files):
+        details["docs_page"] = await _stream_has_github_folder(resp)
+    return details
 
 
 def _fmt(msg: str, url: str, files: list[str]) -> str:
     return f"{msg}:\n\t{url}\n\t[\n\t\t{chr(10).join(files)}\n\t]"
 
 
+def _is_usable(verdict: Verdict, url: str, files: list[str], is_github_issue: bool) -> bool:
+    """A cached verdict is only usable if it carries every fact this check needs."""
+    if verdict.status != 200:
+        return True
+    details = verdict.details or {}
+    if is_github_issue and "issue_state" not in details:
+        return False
+    return not _needs_docs_page_check(url, files) or "docs_page" in details
+
+
+async def _fetch_verdict(
+    session: aiohttp.ClientSession,
+    scheduler: HostScheduler,
+    url: str,
+    files: list[str],
+    is_github_issue: bool,
+    cache: UrlCache | None,
+) -> Verdict | None:
+    """Return the HTTP verdict for a URL, from the cache when it's still fresh.
+
+    A stale cache entry is revalidated with a conditional request. Returns None
+    when the request itself fails.
+    """
+    cached = cache.get(url) if cache else None
+    if cached and not _is_usable(cached, url, files, is_github_issue):
+        cached = None
+    if cached and cache.is_fresh(cached):
+        return cached
+
+    async def handle(resp: aiohttp.ClientResponse, status: int) -> Verdict:
+        if status == 304 and cached:
+            return cache.touch(url)
+        details = {}
+        if status == 200:
+            details = await _check_200_response(resp, url, files, is_github_issue)
+        return Verdict(
+            status, str(resp.url), str(resp.url).rstrip("/").endswith("/404"),
+            resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", ""),
+            details, time.time(),
+        )
+
+    # Only GitHub issues and lean.io docs pages need the body; everything else
+    # is decided by the status code and final URL alone.
+    needs_body = is_github_issue or _needs_docs_page_check(url, files)
+    try:
+        verdict = await (fetch if needs_body else probe)(
+            scheduler, session, url, handle,
+            headers=conditional_headers(cached) if cached else None)
+    except Exception:
+        return None
+
+    # A throttled response says nothing about the link; don't let it stand in
+    # for a real verdict on the next run.
+    if cache and verdict.status not in THROTTLE_STATUSES:
+        cache.put(url, verdict)
+    return verdict
+
+
+def _record_verdict(verdict: Verdict, url: str, files: list[str], results: dict[str, list[str]]):
+    """Turn an HTTP verdict into error/warning entries."""
+    match verdict.status:
+        case 400:
+            results["400"].append(_fmt("400 Bad Request", url, files))
+        case 401:
+            results["401"].append(_fmt("401 Unauthorized", url, files))
+        case 403:
+            results["403"].append(_fmt("403 Forbidden", url, files))
+        case 404:
+            results["404"].append(_fmt("404 Not found", url, files))
+        case 200:
+            details = verdict.details or {}
+            if "issue_state" in details and details["issue_state"] != "open":
+                results["github_issue_closed"].append(
+                    _fmt(f"GitHub issue is not open (state: {details['issue_state']})", url, files))
+
+            # Check for soft-404 (redirected to /404 page)
+            if verdict.soft_404:
+                results["soft_404"].append(_fmt("Soft 404 (page not found)", url, files))
+
+            if details.get("docs_page") is False:
+                results["invalid_docs_page"].append(
+                    _fmt("Not a valid docs page", url, files))
+
+
+def _check_anchor(url: str, files: list[str], file_index: dict[str, list[str]],
+                  results: dict[str, list[str]], metrics: LinkMetrics | None = None):
+    """Validate a URL's #section anchor against the docs files on disk."""
+    with metrics.phase("anchors") if metrics else contextlib.nullcontext():
+        reason = check_section_anchor(url, BASE_PATH, file_index)
+    if reason:
+        results["missing_section"].append(_fmt(reason, url, files))
+
+
 async def _check_url(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
+    scheduler: HostScheduler,
     url: str,
     files: list[str],
     file_index: dict[str, list[str]],
     results: dict[str, list[str]],
+    cache: UrlCache | None = None,
+    issue_states: dict[int, str | None] | None = None,
+    extracted: asyncio.Event | None = None,
+    metrics: LinkMetrics | None = None,
 ):
-    """Check a single URL for errors."""
+    """Check a single URL for errors.
+
+    When the URL was found while extraction is still running (`extracted` not yet
+    set), `files` may still grow: the HTTP request goes out right away, but the
+    findings are only recorded once every file referencing the URL is known.
+    """
     if not url or not url.startswith("http"):
         return
 
+    is_github_issue = "api.github.com/repos/QuantConnect/Lean/issues" in url
+    number = _issue_number(url) if is_github_issue else None
+    http_seconds = None
+    if issue_states and number in issue_states:
+        # -- GitHub issue state (resolved up front in batches, when possible) --
+        state = issue_states[number]
+        verdict = (Verdict(404, url, False) if state is None
+                   else Verdict(200, url, False, details={"issue_state": state}))
+    else:
+        # Whether a lean.io page needs its body depends on the files linking to it.
+        if extracted and _is_lean_io_docs_page(url):
+            await extracted.wait()
+        # -- HTTP request (or cached verdict) --
+        http_start = time.perf_counter()
+        verdict = await _fetch_verdict(session, scheduler, url, files, is_github_issue, cache)
+        http_seconds = time.perf_counter() - http_start
+    if extracted:
+        await extracted.wait()
+
+    counts = {category: len(items) for category, items in results.items()}
+    _record_findings(url, files, verdict, file_index, results, metrics)
+    if metrics:
+        metrics.record(url, [c for c, items in results.items() if len(items) > counts[c]],
+                       http_seconds)
+
+
+def _record_findings(url: str, files: list[str], verdict: Verdict | None,
+                     file_index: dict[str, list[str]], results: dict[str, list[str]],
+                     metrics: LinkMetrics | None):
+    """Record every finding of one URL check."""
     # -- Deprecated docs check (no HTTP needed) --
     if f"{ROOT}docs/" in url and "/docs/v1/" not in url and "/docs/v2/" not in url:
         results["deprecated_docs"].append(_fmt("Deprecated docs URL", url, files))
@@ -315,31 +717,26 @@ async def _check_url(
             results["leanio_nonexistence"].append(_fmt("Lean.io non-existence", url, files))
 
     # -- Section anchor validation (local, no HTTP needed) --
-    reason = check_section_anchor(url, BASE_PATH, file_index)
-    if reason:
-        results["missing_section"].append(_fmt(reason, url, files))
+    _check_anchor(url, files, file_index, results, metrics)
 
-    # -- GitHub issue API check --
-    is_github_issue = "api.github.com/repos/QuantConnect/Lean/issues" in url
+    if verdict is None:
+        results["failed_request"].append(_fmt("Failed to request", url, files))
+        return
+    _record_verdict(verdict, url, files, results)
 
-    # -- HTTP request --
-    async with semaphore:
-        try:
-            async with session.get(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=60)) as resp:
-                match resp.status:
-                    case 400:
-                        results["400"].append(_fmt("400 Bad Request", url, files))
-                    case 401:
-                        results["401"].append(_fmt("401 Unauthorized", url, files))
-                    case 403:
-                        results["403"].append(_fmt("403 Forbidden", url, files))
-                    case 404:
-                        results["404"].append(_fmt("404 Not found", url, files))
-                    case 200:
-                        await _check_200_response(resp, url, files, is_github_issue, results)
 
-        except Exception:
-            results["failed_request"].append(_fmt("Failed to request", url, files))
+async def _stream_has_github_folder(resp: aiohttp.ClientResponse) -> bool:
+    """Run _check_github_folder_in_html over the body as it streams in, and stop
+    reading as soon as a matching anchor link is found."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    tail = ""
+    async for chunk in resp.content.iter_chunked(STREAM_CHUNK):
+        window = tail + decoder.decode(chunk)
+        if _check_github_folder_in_html(window):
+            return True
+        # Keep enough overlap that an anchor tag split across chunks still matches.
+        tail = window[-STREAM_OVERLAP:]
+    return _check_github_folder_in_html(tail + decoder.decode(b"", final=True))
 
 
 def _check_github_folder_in_html(html: str) -> bool:
@@ -378,75 +775,149 @@ async def main():
     parser = argparse.ArgumentParser(description="Check documentation for broken links.")
     parser.add_argument("--create-issue", action="store_true",
                         help="Create/update/close a GitHub issue via `gh` CLI when errors are found.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore the on-disk URL verdict cache and re-check every URL.")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600, metavar="HOURS",
+                        help="Reuse cached verdicts younger than this without revalidating "
+                             f"(default: {DEFAULT_TTL // 3600}).")
+    parser.add_argument("--since", metavar="GIT_REF",
+                        help="Only check links in files changed since the last full scan, "
+                             "plus anchors into added/deleted/renamed sections. The scan "
+                             "must come from a commit before GIT_REF. Can't be combined "
+                             "with --create-issue.")
+    parser.add_argument("--json", metavar="PATH",
+                        help="Also write per-URL timings, retries and categories as JSON to PATH.")
+    parser.add_argument("--junit", metavar="PATH",
+                        help="Also write a JUnit XML report (one testcase per URL) to PATH.")
     args = parser.parse_args()
+    if args.since and args.create_issue:
+        # The issue lists every broken link, but a --since run only finds the ones
+        # in the changed files; it would close the issue on a partial result.
+        parser.error("--create-issue needs a full scan; drop --since")
 
     start = time.perf_counter()
+    metrics = LinkMetrics("url_check") if args.json or args.junit else None
+    phase = metrics.phase if metrics else lambda name: contextlib.nullcontext()
 
     print("Extracting URLs from documentation files...")
-    doc_files, file_index = _collect_files()
-    url_files = _get_all_urls(doc_files)
-    strategy_urls = _get_strategy_php_urls()
-    url_files.update(strategy_urls)
-
-    resource_files = _get_resource_redirects(doc_files)
-
-    count = len(url_files)
-    print(f"Start Testing {count} URLs...")
+    with phase("scan"):
+        incremental = _incremental_scan(args.since) if args.since else None
+        if incremental is None:
+            doc_files, file_index = _collect_files()
+        elif incremental[2] or incremental[3]:
+            # A section anchor can point at any file in the tree, so checking even
+            # one link needs the whole index (revalidated from the doc index cache).
+            file_index = build_file_index(BASE_PATH)
+        else:
+            file_index = None
 
     results: dict[str, list[str]] = {cat: [] for cat in SEVERITY}
-    semaphore = asyncio.Semaphore(CONCURRENCY)
-
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY, limit_per_host=20)
-    async with aiohttp.ClientSession(
-        connector=connector,
-        headers={"User-Agent": USER_AGENT},
-    ) as session:
-        tasks = []
-        for url, files in url_files.items():
-            tasks.append(_check_url(session, semaphore, url, files, file_index, results))
-
-        # Run all checks concurrently with progress bar
-        done = 0
-        for coro in asyncio.as_completed(tasks):
-            await coro
-            done += 1
-            if done % CONCURRENCY == 0 or done == count:
-                filled = int(CONCURRENCY * done / count)
-                bar = "#" * filled + "-" * (CONCURRENCY - filled)
-                print(f"\r  [{bar}] {done}/{count} ({done/count:.1%})", end="", flush=True)
+    scheduler = HostScheduler(CONCURRENCY)
+    cache = None if args.no_cache else UrlCache(CACHE_FILE, ttl=args.cache_ttl * 3600)
+
+    # Extraction is pipelined with the HTTP checks, so the "scan" phase overlaps "http".
+    try:
+        with phase("http"):
+            async with aiohttp.ClientSession(
+                connector=make_connector(CONCURRENCY),
+                headers={"User-Agent": USER_AGENT},
+                trace_configs=[metrics.trace_config()] if metrics else None,
+            ) as session:
+                # HTTP checks start as soon as a URL is extracted; GitHub issue links wait
+                # until extraction is done, so their states resolve in as few batches as possible.
+                extracted = asyncio.Event()
+                tasks = []
+
+                def start_checks(found: dict[str, list[str]], urls: list[str]):
+                    for url in urls:
+                        if _issue_number(url) is None:
+                            tasks.append(asyncio.create_task(_check_url(
+                                session, scheduler, url, found[url], file_index, results,
+                                cache, extracted=extracted, metrics=metrics)))
+
+                if incremental:
+                    url_files, resource_files, to_check, to_anchor = incremental
+                    for url in to_anchor:
+                        _check_anchor(url, url_files[url], file_index, results, metrics)
+                    url_files = {url: url_files[url] for url in to_check}
+                    start_checks(url_files, list(url_files))
+                else:
+                    with phase("scan"):
+                        url_files, resource_files = await _extract_links_streaming(
+                            doc_files, start_checks)
+                        strategy_urls = _get_strategy_php_urls()
+                        url_files.update(strategy_urls)
+
+                        # A --since run that fell back to a full scan mustn't replace
+                        # the shared baseline with its branch's links.
+                        if not args.since:
+                            _save_snapshot(url_files, resource_files)
+                extracted.set()
+
+                issue_states = await _resolve_issue_states(session, list(url_files), cache)
+                for url, files in url_files.items():
+                    if _issue_number(url) is not None:
+                        tasks.append(asyncio.create_task(_check_url(
+                            session, scheduler, url, files, file_index, results, cache,
+                            issue_states, metrics=metrics)))
+
+                count = len(tasks)
+                print(f"Start Testing {count} URLs...")
+
+                # Run all checks concurrently with progress bar
+                done = 0
+                for coro in asyncio.as_completed(tasks):
+                    await coro
+                    done += 1
+                    if done % CONCURRENCY == 0 or done == count:
+                        filled = int(CONCURRENCY * done / count)
+                        bar = "#" * filled + "-" * (CONCURRENCY - filled)
+                        print(f"\r  [{bar}] {done}/{count} ({done/count:.1%})", end="", flush=True)
+    finally:
+        # Flush the verdicts even when the run fails part way.
+        if cache:
+            cache.close()
 
     # Check resource redirects
     print(f"\nNow check {len(resource_files)} RESOURCE redirection.")
-    _check_resources(resource_files, results)
+    with phase("resources"):
+        _check_resources(resource_files, results)
 
     print(f"Finished in {time.perf_counter() - start:.2f}s")
 
-    # Separate into errors and warnings based on SEVERITY config
-    error_count = 0
-    warning_count = 0
-
-    for category, items in results.items():
-        if not items:
-            continue
-        severity = SEVERITY[category]
-        label = "ERROR" if severity == "error" else "WARNING"
-        if severity == "error":
-            error_count += len(items)
-        else:
-            warning_count += len(items)
-
-        print(f"\n{'='*60}")
-        print(f"{label}S - {category} ({len(items)}):")
-        print(f"{'='*60}")
-        for item in items:
-            print(f"  {label}: {item}")
+    with phase("report"):
+        # Separate into errors and warnings based on SEVERITY config
+        error_count = 0
+        warning_count = 0
 
-    print(f"\n{'-'*60}")
-    print(f"Summary: {error_count} error(s), {warning_count} warning(s)")
-    print(f"{'-'*60}")
-
-    if args.create_issue:
-        _manage_github_issue(results, error_count > 0)
+        for category, items in results.items():
+            if not items:
+                continue
+            severity = SEVERITY[category]
+            label = "ERROR" if severity == "error" else "WARNING"
+            if severity == "error":
+                error_count += len(items)
+            else:
+                warning_count += len(items)
+
+            print(f"\n{'='*60}")
+            print(f"{label}S - {category} ({len(items)}):")
+            print(f"{'='*60}")
+            for item in items:
+                print(f"  {label}: {item}")
+
+        print(f"\n{'-'*60}")
+        print(f"Summary: {error_count} error(s), {warning_count} warning(s)")
+        print(f"{'-'*60}")
+
+        if args.create_issue:
+            _manage_github_issue(results, error_count > 0)
+
+    if args.json:
+        metrics.write_json(Path(args.json), SEVERITY,
+                           {category: len(items) for category, items in results.items()})
+    if args.junit:
+        metrics.write_junit(Path(args.junit), SEVERITY)
 
     if error_count > 0:
         print(f"\nFAILED: {error_count} broken link(s) found.")